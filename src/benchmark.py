@@ -0,0 +1,562 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Módulos do núcleo de similaridade: devem importar apenas com o sqlglot
+CORE_MODULES = ['graph_structures', 'graph_generator', 'vf2', 'mcs_finder']
+# Dependências pesadas que só a visualização pode carregar
+HEAVY_MODULES = ['matplotlib', 'networkx', 'numpy']
+
+_STARTUP_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+loaded = sorted({{m.split('.')[0] for m in sys.modules}} & set({heavy!r}))
+print(json.dumps({{'seconds': elapsed, 'heavy_modules': loaded}}))
+"""
+
+def measure_startup(modules, repeat=5):
+    """
+    Importa `modules` em um interpretador novo `repeat` vezes e mede o tempo
+    de importação.
+
+    Returns:
+        Dicionário com os tempos (s) e as dependências pesadas carregadas.
+    """
+    probe = _STARTUP_PROBE.format(modules=list(modules), heavy=HEAVY_MODULES)
+    timings = []
+    heavy = set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', probe], cwd=SRC_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        timings.append(result['seconds'])
+        heavy.update(result['heavy_modules'])
+    return {'modules': list(modules), 'repeat': repeat, 'min_seconds': min(timings),
+            'max_seconds': max(timings), 'heavy_modules': sorted(heavy)}
+
+def run_startup(args):
+    """
+    Guarda de tempo de inicialização: falha se o núcleo (ou a CLI) carregar
+    matplotlib/networkx/numpy, ou se a importação passar de --max-ms.
+    """
+    failed = False
+    for modules in (CORE_MODULES, ['main']):
+        result = measure_startup(modules, repeat=args.repeat)
+        print(json.dumps(result))
+        if result['heavy_modules']:
+            print(f"FALHA: {modules} carregou {result['heavy_modules']}", file=sys.stderr)
+            failed = True
+        if args.max_ms is not None and result['min_seconds'] * 1000 > args.max_ms:
+            print(f"FALHA: importar {modules} levou {result['min_seconds'] * 1000:.1f} ms "
+                  f"(limite {args.max_ms} ms)", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+# Configuração base do suite; cada varredura altera um único parâmetro
+SUITE_BASE = {'tables': 3, 'joins': 2, 'columns': 4, 'filters': 2, 'overlap': 0.5}
+SUITE_SWEEPS = {
+    'tables': [1, 2, 4, 8],
+    'joins': [0, 1, 2],
+    'columns': [2, 4, 8, 16],
+    'filters': [0, 2, 4, 8],
+    'overlap': [0.0, 0.5, 0.9, 1.0],
+}
+# Etapas medidas separadamente em cada ponto da varredura
+SUITE_STAGES = ['parse_seconds', 'build_seconds', 'mcs_seconds']
+
+def measure_workload(pairs, engine='auto', repeat=3):
+    """
+    Mede, separadamente, o parsing (sqlglot), a construção dos grafos e a busca
+    do MCS para uma lista de pares de queries. Cada etapa soma o tempo de todos
+    os pares; vale a menor soma entre `repeat` rodadas.
+    """
+    import sqlglot
+    from graph_generator import generate_graph_from_ast
+    from mcs_finder import find_mcs_result
+
+    best = dict.fromkeys(SUITE_STAGES, float('inf'))
+    nodes = mcs_nodes = 0
+    for _ in range(repeat):
+        timings = dict.fromkeys(SUITE_STAGES, 0.0)
+        nodes = mcs_nodes = 0
+        for sql_a, sql_b in pairs:
+            start = time.perf_counter()
+            ast_a, ast_b = sqlglot.parse_one(sql_a), sqlglot.parse_one(sql_b)
+            parsed = time.perf_counter()
+            graph_a, graph_b = generate_graph_from_ast(ast_a), generate_graph_from_ast(ast_b)
+            built = time.perf_counter()
+            result = find_mcs_result(graph_a, graph_b, engine=engine, verbose=False)
+            done = time.perf_counter()
+
+            timings['parse_seconds'] += parsed - start
+            timings['build_seconds'] += built - parsed
+            timings['mcs_seconds'] += done - built
+            nodes += len(graph_a.nodes) + len(graph_b.nodes)
+            mcs_nodes += result.size
+        for stage in SUITE_STAGES:
+            best[stage] = min(best[stage], timings[stage])
+
+    best['mean_nodes'] = nodes / (2 * len(pairs)) if pairs else 0.0
+    best['mean_mcs_nodes'] = mcs_nodes / len(pairs) if pairs else 0.0
+    return best
+
+def run_suite_measurements(pairs=20, seed=0, engine='auto', repeat=3, sweeps=None):
+    """
+    Executa as varreduras do suite e retorna a lista de resultados, um por
+    ponto (ex: 'tables=4'), cada um com os parâmetros e os tempos por etapa.
+    """
+    from sql_workload import generate_query_pairs
+
+    results = []
+    for parameter, values in (sweeps or SUITE_SWEEPS).items():
+        for value in values:
+            params = dict(SUITE_BASE, **{parameter: value})
+            workload = generate_query_pairs(pairs, seed=seed, **params)
+            result = {'name': f"{parameter}={value}", 'params': params, 'pairs': pairs}
+            result.update(measure_workload(workload, engine=engine, repeat=repeat))
+            results.append(result)
+    return results
+
+def compare_with_baseline(results, baseline, tolerance=0.25, min_seconds=0.001):
+    """
+    Compara os tempos com os de um baseline (mesmo formato JSON do suite).
+
+    Returns:
+        Lista de mensagens, uma por etapa que ficou mais de `tolerance` mais
+        lenta; etapas abaixo de `min_seconds` no baseline são ignoradas (ruído).
+    """
+    reference = {item['name']: item for item in baseline['results']}
+    regressions = []
+    for result in results:
+        previous = reference.get(result['name'])
+        if previous is None:
+            continue
+        for stage in SUITE_STAGES:
+            before, after = previous.get(stage), result[stage]
+            if before is None or before < min_seconds:
+                continue
+            if after > before * (1 + tolerance):
+                regressions.append(f"{result['name']} {stage}: {before * 1000:.2f} ms -> "
+                                   f"{after * 1000:.2f} ms (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+def run_suite(args):
+    """
+    Suite de desempenho com queries sintéticas: grava os tempos em JSON e,
+    com --baseline, falha se alguma etapa ficar mais lenta que a tolerância.
+    """
+    sweeps = SUITE_SWEEPS
+    if args.sweep:
+        sweeps = {name: SUITE_SWEEPS[name] for name in args.sweep}
+
+    results = run_suite_measurements(pairs=args.pairs, seed=args.seed, engine=args.engine,
+                                     repeat=args.repeat, sweeps=sweeps)
+    report = {'benchmark': 'suite', 'seed': args.seed, 'engine': args.engine,
+              'python': sys.version.split()[0], 'results': results}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(results, baseline, tolerance=args.tolerance,
+                                        min_seconds=args.min_ms / 1000)
+    for message in regressions:
+        print(f"REGRESSÃO: {message}", file=sys.stderr)
+    return 1 if regressions else 0
+
+def measure_parallel(pairs=3, seed=0, workers=None, tables=4, filters=2):
+    """
+    Compara a busca VF2 sequencial com a paralela (ParallelVF2Matcher) em
+    pares sintéticos difíceis para o VF2. Os tamanhos (e os mapeamentos) têm de
+    ser iguais.
+
+    Returns:
+        Lista com os tempos, o speedup e o tamanho do MCS de cada par.
+    """
+    import contextlib
+    import io
+    from graph_generator import generate_graph_from_sql
+    from parallel_vf2 import ParallelVF2Matcher
+    from sql_workload import generate_query_pairs
+    from vf2 import VF2Matcher
+
+    params = dict(SUITE_BASE, tables=tables, filters=filters)
+    results = []
+    for sql_a, sql_b in generate_query_pairs(pairs, seed=seed, **params):
+        with contextlib.redirect_stdout(io.StringIO()):
+            graph_a, graph_b = generate_graph_from_sql(sql_a), generate_graph_from_sql(sql_b)
+
+        start = time.perf_counter()
+        sequential = VF2Matcher(graph_a, graph_b).find_mcs_mapping()
+        sequential_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matcher = ParallelVF2Matcher(graph_a, graph_b, workers=workers)
+        parallel = matcher.find_mcs_mapping()
+        parallel_seconds = time.perf_counter() - start
+
+        results.append({'nodes': [len(graph_a), len(graph_b)], 'mcs_nodes': len(sequential),
+                        'subproblems': matcher.subproblems,
+                        'sequential_seconds': sequential_seconds,
+                        'parallel_seconds': parallel_seconds,
+                        'speedup': sequential_seconds / parallel_seconds,
+                        'same_size': len(parallel) == len(sequential),
+                        'same_mapping': parallel == sequential})
+    return results
+
+def run_parallel(args):
+    """Speedup da busca VF2 paralela; falha se algum resultado divergir do sequencial."""
+    results = measure_parallel(pairs=args.pairs, seed=args.seed, workers=args.workers,
+                               tables=args.tables, filters=args.filters)
+    report = {'benchmark': 'parallel', 'workers': args.workers or os.cpu_count(),
+              'results': results}
+    print(json.dumps(report, indent=2))
+    if not all(result['same_size'] for result in results):
+        print("FALHA: a busca paralela divergiu da sequencial", file=sys.stderr)
+        return 1
+    return 0
+
+def _pearson(xs, ys):
+    """Correlação de Pearson (None se alguma das séries for constante)."""
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    if not var_x or not var_y:
+        return None
+    return cov / (var_x * var_y) ** 0.5
+
+def _ranks(values):
+    """Postos (1..n) dos valores, com a média dos postos nos empates."""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    start = 0
+    while start < len(order):
+        end = start
+        while end + 1 < len(order) and values[order[end + 1]] == values[order[start]]:
+            end += 1
+        for position in range(start, end + 1):
+            ranks[order[position]] = (start + end) / 2 + 1
+        start = end + 1
+    return ranks
+
+def approx_pairs(corpus=None, pairs=200, seed=0):
+    """
+    Pares de queries para a avaliação do modo aproximado: de um arquivo de
+    queries (pares sorteados entre elas, com semente fixa) ou, sem arquivo,
+    pares sintéticos com sobreposições de 0 a 1.
+    """
+    import random
+    from sql_workload import generate_query_pairs
+
+    if corpus:
+        from query_stream import iter_queries
+        queries = list(iter_queries(corpus))
+        rng = random.Random(seed)
+        all_pairs = [(a, b) for a in range(len(queries)) for b in range(a + 1, len(queries))]
+        chosen = rng.sample(all_pairs, min(pairs, len(all_pairs)))
+        return [(queries[a], queries[b]) for a, b in chosen]
+
+    overlaps = [0.0, 0.25, 0.5, 0.75, 0.9, 1.0]
+    per_overlap = max(1, pairs // len(overlaps))
+    return [pair for overlap in overlaps
+            for pair in generate_query_pairs(per_overlap, seed=seed, **dict(SUITE_BASE, overlap=overlap))]
+
+def measure_approx(pairs, engine='auto', iterations=(1, 2, 3), normalizations=('min', 'cosine')):
+    """
+    Compara a similaridade aproximada (WLScorer) com a exata (MCS) em cada par.
+
+    Returns:
+        Uma entrada por configuração (iterações, normalização) com a correlação
+        de Pearson e de Spearman, o erro médio, o p95 e o máximo do desvio
+        absoluto (em pontos percentuais) e o tempo médio por par, em µs.
+    """
+    import contextlib
+    import io
+    from graph_cache import GraphCache
+    from mcs_finder import find_maximum_common_subgraph, calculate_similarity_percentage
+    from wl_similarity import WLScorer
+
+    cache = GraphCache(maxsize=max(1024, 2 * len(pairs)))
+    exact = []
+    valid = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for sql_a, sql_b in pairs:
+            graph_a, graph_b = cache.get_graph(sql_a), cache.get_graph(sql_b)
+            if not graph_a or not graph_b:
+                continue
+            mcs = find_maximum_common_subgraph(graph_a, graph_b, engine=engine, verbose=False)
+            exact.append(calculate_similarity_percentage(graph_a, graph_b, mcs) if mcs else 0.0)
+            valid.append((sql_a, sql_b))
+
+    results = []
+    for iteration in iterations:
+        for normalization in normalizations:
+            scorer = WLScorer(cache=cache, iterations=iteration, normalization=normalization,
+                              maxsize=max(1024, 2 * len(valid)))
+            for sql_a, sql_b in valid: # Aquece o cache de vetores
+                scorer.features(sql_a), scorer.features(sql_b)
+            start = time.perf_counter()
+            approx = [scorer.similarity(sql_a, sql_b) for sql_a, sql_b in valid]
+            elapsed = time.perf_counter() - start
+
+            deviations = sorted(abs(a - e) for a, e in zip(approx, exact))
+            results.append({
+                'iterations': iteration,
+                'normalization': normalization,
+                'pairs': len(valid),
+                'pearson': _pearson(approx, exact),
+                'spearman': _pearson(_ranks(approx), _ranks(exact)),
+                'mean_abs_error': sum(deviations) / len(deviations),
+                'p95_deviation': deviations[int(0.95 * (len(deviations) - 1))],
+                'max_deviation': deviations[-1],
+                # Desvio máximo por faixa de similaridade exata: onde o modo
+                # aproximado é confiável
+                'max_deviation_by_exact': {
+                    f"{low}-{low + 25}": max((abs(a - e) for a, e in zip(approx, exact)
+                                              if low <= e < low + 25 or (low == 75 and e == 100)),
+                                             default=None)
+                    for low in (0, 25, 50, 75)},
+                'microseconds_per_pair': elapsed / len(valid) * 1e6,
+            })
+    return results
+
+def run_approx(args):
+    """
+    Avaliação do modo aproximado contra o MCS exato; com --max-deviation, falha
+    se o desvio máximo da configuração padrão do WLScorer (1 iteração,
+    'cosine') passar disso.
+    """
+    pairs = approx_pairs(corpus=args.corpus, pairs=args.pairs, seed=args.seed)
+    results = measure_approx(pairs, engine=args.engine)
+    print(json.dumps({'benchmark': 'approx', 'engine': args.engine, 'results': results}, indent=2))
+    if args.max_deviation is None:
+        return 0
+    default = next(r for r in results if r['iterations'] == 1 and r['normalization'] == 'cosine')
+    if default['max_deviation'] > args.max_deviation:
+        print(f"FALHA: desvio máximo de {default['max_deviation']:.1f} pontos "
+              f"(limite {args.max_deviation})", file=sys.stderr)
+        return 1
+    return 0
+
+def measure_memory(graphs=2000, seed=0):
+    """
+    Memória retida por grafo (tracemalloc) em cada representação: o Graph
+    congelado gerado a partir do SQL e o CompactGraph equivalente.
+
+    Returns:
+        Dicionário com os bytes médios por grafo de cada representação.
+    """
+    import contextlib
+    import io
+    import tracemalloc
+    import sqlglot
+    from graph_generator import generate_graph_from_ast
+    from graph_structures import CompactGraph
+    from sql_workload import generate_query_pairs
+
+    queries = [sql for pair in generate_query_pairs(graphs // 2 + 1, seed=seed, **SUITE_BASE)
+               for sql in pair][:graphs]
+    asts = [sqlglot.parse_one(sql) for sql in queries]
+
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        with contextlib.redirect_stdout(io.StringIO()):
+            full = [generate_graph_from_ast(ast) for ast in asts]
+        graph_bytes = tracemalloc.get_traced_memory()[0] - start
+
+        start = tracemalloc.get_traced_memory()[0]
+        compact = [CompactGraph.from_graph(graph) for graph in full]
+        compact_bytes = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+
+    return {'graphs': len(full), 'mean_nodes': sum(len(g) for g in full) / len(full),
+            'graph_bytes_per_graph': graph_bytes / len(full),
+            'compact_bytes_per_graph': compact_bytes / len(compact),
+            'ratio': graph_bytes / compact_bytes if compact_bytes else None}
+
+def run_memory(args):
+    """Bytes por grafo de cada representação; com --max-bytes, falha se o compacto passar disso."""
+    result = measure_memory(graphs=args.graphs, seed=args.seed)
+    print(json.dumps(result))
+    if args.max_bytes is not None and result['compact_bytes_per_graph'] > args.max_bytes:
+        print(f"FALHA: CompactGraph usa {result['compact_bytes_per_graph']:.0f} bytes por grafo "
+              f"(limite {args.max_bytes})", file=sys.stderr)
+        return 1
+    return 0
+
+def measure_corpus(queries=2000, seed=0):
+    """
+    Tempo para obter os grafos de um corpus: pelo parsing do SQL (sqlglot +
+    `generate_graph_from_ast`) e abrindo um GraphCorpus já gravado, que mapeia
+    o arquivo e percorre todos os grafos.
+
+    Returns:
+        Dicionário com os tempos (s) e o tamanho do arquivo por grafo.
+    """
+    import contextlib
+    import io
+    import tempfile
+    from graph_cache import GraphCache
+    from graph_corpus import GraphCorpus
+    from sql_workload import generate_query_pairs
+
+    sqls = [sql for pair in generate_query_pairs(queries // 2 + 1, seed=seed, **SUITE_BASE)
+            for sql in pair][:queries]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'corpus.sgc')
+        cache = GraphCache(maxsize=len(sqls))
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            items = [(cache.fingerprint(sql), sql, cache.get_graph(sql)) for sql in sqls]
+        parse_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        GraphCorpus(path).append(items)
+        write_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with GraphCorpus(path, create=False) as corpus:
+            stored = sum(1 for _ in corpus)
+        load_seconds = time.perf_counter() - start
+        file_bytes = os.path.getsize(path)
+
+    return {'queries': len(sqls), 'graphs': stored, 'parse_seconds': parse_seconds,
+            'write_seconds': write_seconds, 'load_seconds': load_seconds,
+            'speedup': parse_seconds / load_seconds if load_seconds else None,
+            'file_bytes_per_graph': file_bytes / stored if stored else None}
+
+def run_corpus(args):
+    """Parsing contra carga do corpus em disco; com --min-speedup, falha abaixo disso."""
+    result = measure_corpus(queries=args.queries, seed=args.seed)
+    print(json.dumps(result))
+    if args.min_speedup is not None and (result['speedup'] or 0) < args.min_speedup:
+        print(f"FALHA: o corpus carrega só {result['speedup']:.1f}x mais rápido que o parsing "
+              f"(mínimo {args.min_speedup})", file=sys.stderr)
+        return 1
+    return 0
+
+# Similaridades esperadas dos casos de tests/ (arquivo -> porcentagem)
+CASES_FILE = os.path.join(SRC_DIR, 'tests', 'esperado.json')
+
+def measure_cases(engine='auto', expected_file=CASES_FILE):
+    """
+    Similaridade de cada caso listado em `expected_file` (caminhos relativos à
+    pasta do arquivo), calculada com o motor pedido, ao lado da esperada.
+    """
+    from graph_generator import generate_graph_from_sql
+    from main import read_queries_from_file
+    from mcs_finder import find_mcs_result, calculate_similarity_percentage
+
+    with open(expected_file, encoding='utf-8') as f:
+        expected = json.load(f)
+    base_dir = os.path.dirname(expected_file)
+    results = []
+    for name, similarity in expected.items():
+        sql_a, sql_b = read_queries_from_file(os.path.join(base_dir, name))
+        graph_a, graph_b = generate_graph_from_sql(sql_a), generate_graph_from_sql(sql_b)
+        result = find_mcs_result(graph_a, graph_b, engine=engine, verbose=False)
+        found = calculate_similarity_percentage(graph_a, graph_b, result.graph) if result.graph else 0.0
+        results.append({'case': name, 'expected': similarity, 'similarity': round(found, 2),
+                        'mcs_nodes': result.size})
+    return results
+
+def run_cases(args):
+    """Confere os casos de tests/ com as similaridades esperadas; falha em qualquer diferença."""
+    failed = False
+    for result in measure_cases(engine=args.engine, expected_file=args.expected):
+        print(json.dumps(result))
+        if abs(result['similarity'] - result['expected']) > 0.01:
+            print(f"FALHA: {result['case']} deu {result['similarity']:.2f}% "
+                  f"(esperado {result['expected']:.2f}%)", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do SQL-MCS.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    startup = subparsers.add_parser('startup', help="Mede o tempo de importação do núcleo e da CLI.")
+    startup.add_argument('--repeat', type=int, default=5)
+    startup.add_argument('--max-ms', type=float, default=None,
+                         help="Tempo máximo de importação aceito, em milissegundos.")
+    startup.set_defaults(func=run_startup)
+
+    suite = subparsers.add_parser('suite', help="Mede parsing, grafos e MCS em queries sintéticas.")
+    suite.add_argument('--pairs', type=int, default=20, help="Pares de queries por ponto.")
+    suite.add_argument('--seed', type=int, default=0)
+    suite.add_argument('--repeat', type=int, default=3)
+    suite.add_argument('--engine', choices=['auto', 'forest', 'vf2'], default='auto',
+                       help="Motor do MCS ('auto' usa o motor exato de florestas nos "
+                            "grafos de SQL).")
+    suite.add_argument('--sweep', action='append', choices=list(SUITE_SWEEPS),
+                       help="Executa só esta varredura (pode ser repetido).")
+    suite.add_argument('--output', help="Grava o resultado JSON neste arquivo.")
+    suite.add_argument('--baseline', help="Resultado JSON anterior para comparação.")
+    suite.add_argument('--tolerance', type=float, default=0.25,
+                       help="Lentidão relativa aceita em relação ao baseline.")
+    suite.add_argument('--min-ms', type=float, default=1.0,
+                       help="Etapas mais rápidas que isso no baseline não são comparadas.")
+    suite.set_defaults(func=run_suite)
+
+    parallel = subparsers.add_parser('parallel', help="Compara a busca VF2 sequencial e a paralela.")
+    parallel.add_argument('--pairs', type=int, default=3)
+    parallel.add_argument('--seed', type=int, default=0)
+    parallel.add_argument('--workers', type=int, default=None,
+                          help="Processos da busca paralela (padrão: número de CPUs).")
+    parallel.add_argument('--tables', type=int, default=4)
+    parallel.add_argument('--filters', type=int, default=2)
+    parallel.set_defaults(func=run_parallel)
+
+    approx = subparsers.add_parser('approx', help="Erro da similaridade WL aproximada contra o MCS exato.")
+    approx.add_argument('--corpus', help="Arquivo de queries (padrão: pares sintéticos).")
+    approx.add_argument('--pairs', type=int, default=300)
+    approx.add_argument('--seed', type=int, default=0)
+    approx.add_argument('--engine', choices=['auto', 'forest', 'vf2'], default='auto',
+                        help="Motor do MCS exato de referência.")
+    approx.add_argument('--max-deviation', type=float, default=None,
+                        help="Desvio máximo aceito, em pontos percentuais.")
+    approx.set_defaults(func=run_approx)
+
+    memory = subparsers.add_parser('memory', help="Mede os bytes por grafo de Graph e CompactGraph.")
+    memory.add_argument('--graphs', type=int, default=2000)
+    memory.add_argument('--seed', type=int, default=0)
+    memory.add_argument('--max-bytes', type=int, default=None,
+                        help="Bytes por CompactGraph aceitos.")
+    memory.set_defaults(func=run_memory)
+
+    corpus = subparsers.add_parser('corpus', help="Compara o parsing das queries com a carga do corpus em disco.")
+    corpus.add_argument('--queries', type=int, default=2000)
+    corpus.add_argument('--seed', type=int, default=0)
+    corpus.add_argument('--min-speedup', type=float, default=None,
+                        help="Aceleração mínima aceita da carga em relação ao parsing.")
+    corpus.set_defaults(func=run_corpus)
+
+    cases = subparsers.add_parser('cases', help="Confere a similaridade dos casos de tests/ com a esperada.")
+    cases.add_argument('--engine', choices=['auto', 'forest', 'vf2'], default='auto')
+    cases.add_argument('--expected', default=CASES_FILE,
+                       help="JSON {arquivo do caso: similaridade esperada}.")
+    cases.set_defaults(func=run_cases)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import sqlglot
+from sqlglot import exp
+
+from graph_generator import generate_graph_from_ast
+from lru_cache import LRUCache
+from mcs_finder import COMPONENT_CACHE, find_maximum_common_subgraph
+
+# Sentinela para distinguir "ausente" de um resultado None guardado no cache
+_MISSING = object()
+
+def query_fingerprint(ast) -> str:
+    """
+    Impressão digital normalizada de uma query: o SQL canônico gerado pelo
+    sqlglot após trocar os literais por placeholders e resolver os aliases de
+    tabela. Queries que diferem apenas em literais, espaços ou aliases de
+    tabela geram o mesmo grafo e, portanto, a mesma impressão digital.
+
+    Args:
+        ast: A expressão raiz retornada por `sqlglot.parse_one`.
+    """
+    ast = ast.copy()
+    table_names = {table.name for table in ast.find_all(exp.Table)}
+    alias_map = {}
+    for table in ast.find_all(exp.Table):
+        if table.alias:
+            alias_map[table.alias] = table.name
+
+    # Um alias igual ao nome de outra tabela é ambíguo: mantém os aliases
+    if table_names & set(alias_map):
+        alias_map = {}
+    for table in ast.find_all(exp.Table):
+        if table.alias in alias_map:
+            table.set('alias', None)
+
+    def normalise(node):
+        if isinstance(node, exp.Literal):
+            return exp.Placeholder()
+        if isinstance(node, exp.Column) and node.table in alias_map:
+            node.set('table', exp.to_identifier(alias_map[node.table]))
+        return node
+
+    return ast.transform(normalise).sql()
+
+class GraphCache:
+    """
+    Cache de grafos SQL -> Graph indexado pela impressão digital da query, com
+    memoização dos resultados de MCS por par de impressões digitais.
+
+    Os grafos devolvidos são congelados e compartilhados entre as chamadas;
+    não devem ser modificados.
+    """
+    def __init__(self, maxsize=1024, pair_maxsize=4096):
+        # Texto exato -> impressão digital: repetições literais nem fazem parsing
+        self.fingerprints = LRUCache(maxsize)
+        self.graphs = LRUCache(maxsize)
+        self.mcs_results = LRUCache(pair_maxsize)
+
+    @staticmethod
+    def _parse(sql_string):
+        try:
+            return sqlglot.parse_one(sql_string)
+        except Exception as e:
+            print(f"Erro ao fazer o parsing da query: {e}")
+            return None
+
+    def _lookup(self, sql_string):
+        """Retorna (impressão digital, grafo) da query, ou (None, None) se inválida."""
+        ast = None
+        fingerprint = self.fingerprints.get(sql_string)
+        if fingerprint is None:
+            ast = self._parse(sql_string)
+            if ast is None:
+                return None, None
+            fingerprint = query_fingerprint(ast)
+            self.fingerprints.put(sql_string, fingerprint)
+
+        graph = self.graphs.get(fingerprint)
+        if graph is None:
+            if ast is None:
+                # Só a impressão digital continuava em cache: refaz o parsing
+                ast = self._parse(sql_string)
+            graph = generate_graph_from_ast(ast)
+            self.graphs.put(fingerprint, graph)
+        return fingerprint, graph
+
+    def fingerprint(self, sql_string: str):
+        """Retorna a impressão digital da query (None se o parsing falhar)."""
+        return self._lookup(sql_string)[0]
+
+    def get_graph(self, sql_string: str):
+        """Equivalente em cache de `generate_graph_from_sql`."""
+        return self._lookup(sql_string)[1]
+
+    def get_mcs(self, sql_a: str, sql_b: str):
+        """
+        Retorna (grafo A, grafo B, grafo MCS) para o par de queries, reutilizando
+        o MCS já calculado para o mesmo par de impressões digitais.
+        """
+        fingerprint_a, graph_a = self._lookup(sql_a)
+        fingerprint_b, graph_b = self._lookup(sql_b)
+        if graph_a is None or graph_b is None:
+            return graph_a, graph_b, None
+
+        key = (fingerprint_a, fingerprint_b)
+        mcs = self.mcs_results.get(key, _MISSING)
+        if mcs is _MISSING:
+            mcs = find_maximum_common_subgraph(graph_a, graph_b, verbose=False)
+            if mcs is not None:
+                mcs.freeze()
+            self.mcs_results.put(key, mcs)
+        return graph_a, graph_b, mcs
+
+    def stats(self) -> dict:
+        """Contadores de acertos, faltas e descartes de cada camada do cache."""
+        return {'fingerprints': self.fingerprints.stats(),
+                'graphs': self.graphs.stats(),
+                'mcs_results': self.mcs_results.stats(),
+                'components': COMPONENT_CACHE.stats()}
@@ -0,0 +1,338 @@
+import mmap
+import os
+import struct
+from array import array
+
+from graph_structures import CompactGraph, StringTable
+
+# Cabeçalho do arquivo: assinatura, versão e um marcador da ordem de bytes
+# (os arrays são gravados na ordem nativa e mapeados sem conversão)
+_FILE_HEADER = struct.Struct('=8sII')
+_MAGIC = b'SQLMCSGC'
+_VERSION = 1
+_BYTE_ORDER_MARK = 0x01020304
+
+# Colunas de cada segmento, na ordem em que são gravadas, e o tipo dos itens.
+# G grafos, N nós, E arestas e S strings novas no segmento:
+_COLUMNS = (
+    ('graph_nodes', 'I'),          # G+1: início dos nós de cada grafo
+    ('graph_edges', 'I'),          # G+1: início das arestas de cada grafo
+    ('node_types', 'I'),           # N: id do tipo na tabela de strings
+    ('labels', 'I'),               # N: id do rótulo na tabela de strings
+    ('values', 'I'),               # N: id do value + 1 (0 = None)
+    ('selected', 'B'),             # N: 1 se o nó é selecionado
+    ('successor_offsets', 'I'),    # N+G: offsets CSR locais (n+1 por grafo)
+    ('successors', 'I'),           # E
+    ('predecessor_offsets', 'I'),  # N+G
+    ('predecessors', 'I'),         # E
+    ('fingerprint_offsets', 'Q'),  # G+1
+    ('fingerprints', 'B'),         # impressões digitais em UTF-8
+    ('sql_offsets', 'Q'),          # G+1
+    ('sql', 'B'),                  # texto das queries em UTF-8
+    ('string_offsets', 'Q'),       # S+1
+    ('strings', 'B'),              # strings novas em UTF-8
+)
+# Cabeçalho do segmento: marca, número de grafos, tamanho total e o tamanho
+# em bytes de cada coluna (antes do alinhamento)
+_SEGMENT_HEADER = struct.Struct('=4sIQ' + 'Q' * len(_COLUMNS))
+_SEGMENT_TAG = b'SEGM'
+# Cada coluna começa em um múltiplo de 8 bytes, para ser lida por cast()
+_ALIGNMENT = 8
+
+def _padded(size):
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
+
+def _text_column(texts):
+    """(offsets, bytes) de uma lista de strings em UTF-8."""
+    offsets = array('Q', [0])
+    data = bytearray()
+    for text in texts:
+        data += text.encode('utf-8')
+        offsets.append(len(data))
+    return offsets, bytes(data)
+
+class _Segment:
+    """Colunas de um segmento: memoryviews sobre o arquivo mapeado, sem cópia."""
+    __slots__ = ('first', 'count') + tuple(name for name, _ in _COLUMNS)
+
+    def __init__(self, first, count, columns):
+        self.first = first # Id global do primeiro grafo do segmento
+        self.count = count
+        for name, column in columns.items():
+            setattr(self, name, column)
+
+    def text(self, offsets, data, index):
+        return str(data[offsets[index]:offsets[index + 1]], 'utf-8')
+
+    def graph(self, index, strings) -> CompactGraph:
+        """CompactGraph do grafo `index` do segmento, com arrays que apontam para o arquivo."""
+        node_start, node_end = self.graph_nodes[index], self.graph_nodes[index + 1]
+        edge_start, edge_end = self.graph_edges[index], self.graph_edges[index + 1]
+        # Os offsets CSR de cada grafo têm n+1 entradas: o grafo i começa i posições adiante
+        offset_start, offset_end = node_start + index, node_end + index + 1
+
+        values = {node_id: strings[value - 1]
+                  for node_id, value in enumerate(self.values[node_start:node_end]) if value}
+        selected = [node_id for node_id, flag in enumerate(self.selected[node_start:node_end]) if flag]
+        return CompactGraph(self.node_types[node_start:node_end], self.labels[node_start:node_end],
+                            self.successor_offsets[offset_start:offset_end],
+                            self.successors[edge_start:edge_end],
+                            self.predecessor_offsets[offset_start:offset_end],
+                            self.predecessors[edge_start:edge_end],
+                            strings=strings, values=values or None, selected=selected)
+
+class GraphCorpus:
+    """
+    Corpus de grafos em disco, em formato binário colunar, para carregar um
+    histórico de queries sem refazer o parsing pelo sqlglot.
+
+    O arquivo é uma sequência de segmentos, cada um com as colunas de um lote
+    de grafos (tipos e rótulos como ids de uma tabela de strings, sucessores e
+    predecessores em CSR), as impressões digitais e o texto das queries. Novos
+    lotes são anexados no fim (`append`), sem reescrever o que já existe; a
+    tabela de strings do corpus é a concatenação das strings novas de cada
+    segmento.
+
+    O arquivo é lido com `mmap`: os grafos (`corpus[i]`) são CompactGraphs cujos
+    arrays apontam para as páginas mapeadas e só são montados quando acessados.
+    Processos que abrem o mesmo arquivo compartilham essas páginas; um
+    GraphCorpus enviado a um pool é serializado só pelo caminho e reaberto no
+    trabalhador.
+    """
+    def __init__(self, path: str, create=True):
+        self.path = path
+        if not os.path.exists(path):
+            if not create:
+                raise FileNotFoundError(path)
+            with open(path, 'wb') as f:
+                f.write(_FILE_HEADER.pack(_MAGIC, _VERSION, _BYTE_ORDER_MARK))
+        self.strings = StringTable()
+        self.segments = []
+        self._maps = []
+        self._size = 0 # Bytes válidos já lidos (até o fim do último segmento completo)
+        self._stored_strings = 0 # Strings da tabela já gravadas no arquivo
+        self._fingerprint_ids = None
+        self.refresh()
+
+    def __reduce__(self):
+        return (GraphCorpus, (self.path, False))
+
+    def __len__(self):
+        if not self.segments:
+            return 0
+        last = self.segments[-1]
+        return last.first + last.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Libera os mapeamentos que não são mais usados por nenhum grafo entregue."""
+        self.segments = []
+        for mapped in self._maps:
+            try:
+                mapped.close()
+            except BufferError:
+                pass # Ainda há grafos apontando para as páginas: o GC libera depois
+        self._maps = []
+
+    def refresh(self) -> int:
+        """
+        Lê os segmentos anexados desde a última leitura (inclusive por outro
+        processo). Um segmento incompleto no fim do arquivo (gravação
+        interrompida) é ignorado. Retorna o número de grafos novos.
+        """
+        before = len(self)
+        file_size = os.path.getsize(self.path)
+        if file_size <= self._size:
+            return 0
+        with open(self.path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+
+        position = self._size
+        if position == 0:
+            magic, version, mark = _FILE_HEADER.unpack_from(view, 0)
+            if magic != _MAGIC:
+                raise ValueError(f"'{self.path}' não é um corpus de grafos")
+            if version != _VERSION:
+                raise ValueError(f"versão {version} do corpus não suportada")
+            if mark != _BYTE_ORDER_MARK:
+                raise ValueError("corpus gravado em uma máquina com outra ordem de bytes")
+            position = _FILE_HEADER.size
+
+        # Strings internadas por um append que falhou antes de gravar seu
+        # segmento não estão no arquivo: os ids seguintes são os das strings
+        # dos segmentos novos
+        self.strings.truncate(self._stored_strings)
+        while position + _SEGMENT_HEADER.size <= file_size:
+            tag, count, length, *sizes = _SEGMENT_HEADER.unpack_from(view, position)
+            if tag != _SEGMENT_TAG or position + length > file_size:
+                break
+            columns = {}
+            start = position + _SEGMENT_HEADER.size
+            for (name, typecode), size in zip(_COLUMNS, sizes):
+                columns[name] = view[start:start + size].cast(typecode)
+                start += _padded(size)
+            segment = _Segment(len(self), count, columns)
+            self.segments.append(segment)
+
+            for index in range(len(segment.string_offsets) - 1):
+                self.strings.intern(segment.text(segment.string_offsets, segment.strings, index))
+            self._stored_strings += len(segment.string_offsets) - 1
+            if self._fingerprint_ids is not None:
+                self._index_segment(segment)
+            position += length
+
+        self._size = position
+        self._maps.append(mapped)
+        return len(self) - before
+
+    def _locate(self, graph_id):
+        """(segmento, posição no segmento) do grafo `graph_id`."""
+        if not 0 <= graph_id < len(self):
+            raise IndexError(graph_id)
+        low, high = 0, len(self.segments) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.segments[middle].first <= graph_id:
+                low = middle
+            else:
+                high = middle - 1
+        segment = self.segments[low]
+        return segment, graph_id - segment.first
+
+    def __getitem__(self, graph_id) -> CompactGraph:
+        segment, index = self._locate(graph_id)
+        return segment.graph(index, self.strings)
+
+    def __iter__(self):
+        for segment in self.segments:
+            for index in range(segment.count):
+                yield segment.graph(index, self.strings)
+
+    def sql(self, graph_id) -> str:
+        """Texto da query do grafo (None se não foi gravado)."""
+        segment, index = self._locate(graph_id)
+        return segment.text(segment.sql_offsets, segment.sql, index) or None
+
+    def fingerprint(self, graph_id) -> str:
+        segment, index = self._locate(graph_id)
+        return segment.text(segment.fingerprint_offsets, segment.fingerprints, index)
+
+    def _index_segment(self, segment):
+        for index in range(segment.count):
+            fingerprint = segment.text(segment.fingerprint_offsets, segment.fingerprints, index)
+            self._fingerprint_ids.setdefault(fingerprint, segment.first + index)
+
+    def find(self, fingerprint):
+        """Id do grafo com esta impressão digital, ou None."""
+        if self._fingerprint_ids is None:
+            # Montado na primeira consulta: quem só lê os grafos não paga por ele
+            self._fingerprint_ids = {}
+            for segment in self.segments:
+                self._index_segment(segment)
+        return self._fingerprint_ids.get(fingerprint)
+
+    def __contains__(self, fingerprint):
+        return self.find(fingerprint) is not None
+
+    def _encode_segment(self, items):
+        """Bytes de um segmento com os itens [(impressão digital, sql, CompactGraph)]."""
+        columns = {name: array(typecode) for name, typecode in _COLUMNS}
+        columns['graph_nodes'].append(0)
+        columns['graph_edges'].append(0)
+        for _, _, graph in items:
+            # Os arrays do CompactGraph usam o menor tipo possível: copiados como listas
+            for name in ('node_types', 'labels', 'successor_offsets', 'successors',
+                         'predecessor_offsets', 'predecessors'):
+                columns[name].extend(getattr(graph, name).tolist())
+            columns['values'].extend(
+                self.strings.intern(graph.values[node_id]) + 1
+                if graph.values and graph.values.get(node_id) is not None else 0
+                for node_id in range(len(graph.node_types)))
+            columns['selected'].extend(node_id in graph.selected
+                                       for node_id in range(len(graph.node_types)))
+            columns['graph_nodes'].append(len(columns['node_types']))
+            columns['graph_edges'].append(len(columns['successors']))
+
+        texts = {}
+        texts['fingerprint_offsets'], texts['fingerprints'] = _text_column(
+            fingerprint for fingerprint, _, _ in items)
+        texts['sql_offsets'], texts['sql'] = _text_column(sql or '' for _, sql, _ in items)
+        # Strings internadas desde o último segmento gravado (incluindo as dos values acima)
+        texts['string_offsets'], texts['strings'] = _text_column(
+            self.strings[string_id] for string_id in range(self._stored_strings, len(self.strings)))
+
+        payload = bytearray()
+        sizes = []
+        for name, _ in _COLUMNS:
+            data = texts[name] if name in texts else columns[name]
+            data = data.tobytes() if isinstance(data, array) else data
+            sizes.append(len(data))
+            payload += data
+            payload += bytes(_padded(len(data)) - len(data))
+        header = _SEGMENT_HEADER.pack(_SEGMENT_TAG, len(items),
+                                      _SEGMENT_HEADER.size + len(payload), *sizes)
+        return header + payload
+
+    def append(self, items) -> int:
+        """
+        Anexa um lote de grafos como um novo segmento no fim do arquivo. Grafos
+        cuja impressão digital já está no corpus (ou repetida no lote) são
+        ignorados.
+
+        Args:
+            items: Iterável de (impressão digital, sql ou None, grafo).
+
+        Returns:
+            Quantidade de grafos anexados.
+        """
+        with open(self.path, 'r+b') as f:
+            _lock(f)
+            # Outro processo pode ter anexado segmentos (e strings) desde a última leitura
+            self.refresh()
+            batch = []
+            seen = set()
+            for fingerprint, sql, graph in items:
+                if fingerprint in seen or fingerprint in self:
+                    continue
+                seen.add(fingerprint)
+                batch.append((fingerprint, sql, CompactGraph.from_graph(graph, self.strings)))
+            if not batch:
+                return 0
+
+            # Descarta um segmento incompleto deixado por uma gravação interrompida
+            f.truncate(self._size)
+            f.seek(self._size)
+            f.write(self._encode_segment(batch))
+            f.flush()
+            os.fsync(f.fileno())
+        self.refresh()
+        return len(batch)
+
+    def add_queries(self, queries, cache=None) -> int:
+        """
+        Gera os grafos das queries (via GraphCache) e anexa as novas em um
+        segmento. Queries inválidas ou vazias são ignoradas.
+        """
+        from graph_cache import GraphCache
+        cache = cache or GraphCache()
+
+        def items():
+            for sql in queries:
+                graph = cache.get_graph(sql)
+                if graph and graph.nodes:
+                    yield cache.fingerprint(sql), sql, graph
+        return self.append(items())
+
+def _lock(f):
+    """Trava exclusiva do arquivo até ele ser fechado (só onde há fcntl)."""
+    try:
+        import fcntl
+    except ImportError:
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
@@ -1,52 +1,96 @@
+from collections import deque
+from contextlib import nullcontext
+
 import sqlglot
 from sqlglot import exp
 from graph_structures import Graph  # Importa a classe Graph do módulo structures
-from sql_extractor import get_clauses_from_ast
-
-from visualizer import visualize_custom_graph # Opcional, para visualização
 
-def generate_graph_from_sql(sql_string: str):
+def generate_graph_from_sql(sql_string: str, stats=None):
     """
     Gera um grafo estruturado a partir de uma string SQL.
 
     Args:
         sql_string: A consulta SQL a ser processada.
+        stats: SearchStats opcional; recebe os tempos das etapas 'parse' e 'build'.
 
     Returns:
-        Um objeto de grafo networkx representando a consulta.
+        O grafo (congelado) representando a consulta, ou None se o parsing falhar.
     """
     try:
-        ast = sqlglot.parse_one(sql_string)
+        with stats.stage('parse') if stats is not None else nullcontext():
+            ast = sqlglot.parse_one(sql_string)
     except Exception as e:
         print(f"Erro ao fazer o parsing da query: {e}")
         return None
 
+    with stats.stage('build') if stats is not None else nullcontext():
+        return generate_graph_from_ast(ast)
+
+def generate_graph_from_ast(ast):
+    """
+    Gera o grafo estruturado a partir de uma AST já produzida pelo sqlglot.
+
+    Args:
+        ast: A expressão raiz retornada por `sqlglot.parse_one`.
+
+    Returns:
+        O grafo (congelado) representando a consulta.
+    """
     G = Graph()
 
     # Dicionário para mapear nomes lógicos (ex: 'users') para IDs numéricos (ex: 0)
     name_to_id_map = {}
 
-    # Cria um mapa para resolver aliases de tabelas
-    alias_map = {}
-    for table in ast.find_all(exp.Table):
-        # Mapeia o alias para o nome real da tabela
-        if table.alias:
-            alias_map[table.alias] = table.name
-        # Mapeia o próprio nome da tabela para ele mesmo, para tabelas sem alias
-        alias_map[table.name] = table.name
+    # 0. Percorre a AST uma única vez, em largura (mesma ordem de `find_all`),
+    # coletando tabelas/aliases, colunas e os predicados da primeira cláusula WHERE
+    alias_map = {}      # Alias ou nome -> nome real da tabela
+    columns = []        # Colunas na ordem de visita
+    # Colunas de cada tipo de predicado (dicts usados como conjuntos ordenados)
+    in_nodes, equals_nodes, notnull_nodes = {}, {}, {}
+    where_found = False
+
+    queue = deque([(ast, False)])
+    while queue:
+        node, in_where = queue.popleft()
+
+        if isinstance(node, exp.Table):
+            # Mapeia o alias para o nome real da tabela
+            if node.alias:
+                alias_map[node.alias] = node.name
+            # Mapeia o próprio nome da tabela para ele mesmo, para tabelas sem alias
+            alias_map[node.name] = node.name
+        elif isinstance(node, exp.Column):
+            columns.append(node)
+        elif in_where:
+            if isinstance(node, exp.In):
+                if isinstance(node.this, exp.Column):
+                    in_nodes[node.this.name] = None
+            elif isinstance(node, exp.EQ):
+                if isinstance(node.left, exp.Column):
+                    equals_nodes[node.left.name] = None
+            elif isinstance(node, exp.Is):
+                if isinstance(node.this, exp.Column):
+                    notnull_nodes[node.this.name] = None
+        elif isinstance(node, exp.Where) and not where_found:
+            where_found = True
+            in_where = True
+
+        for child in node.iter_expressions():
+            queue.append((child, in_where))
 
     # 1. Adiciona nós para cada tabela
     # Usamos os valores do mapa de alias para evitar adicionar o alias como uma tabela
-    for real_table_name in set(alias_map.values()):
-        if real_table_name not in name_to_id_map:
-            table_id = G.add_node(node_type='TABLE', label=real_table_name)
-            name_to_id_map[real_table_name] = table_id
+    for real_table_name in dict.fromkeys(alias_map.values()):
+        table_id = G.add_node(node_type='TABLE', label=real_table_name)
+        name_to_id_map[real_table_name] = table_id
 
     # 2. Adiciona nós para cada coluna e cria arestas para suas tabelas
-    for column in ast.find_all(exp.Column):
+    # Colunas sem qualificador pertencem à primeira tabela encontrada
+    default_alias = next(iter(alias_map), None)
+    for column in columns:
         column_name = column.name
         # Resolve o alias da tabela para encontrar o nome real
-        table_alias = column.table or list(alias_map.keys())[0]
+        table_alias = column.table or default_alias
         real_table_name = alias_map.get(table_alias)
         
         if not real_table_name: continue # Ignora colunas que não conseguimos mapear
@@ -57,47 +101,31 @@ def generate_graph_from_sql(sql_string: str):
             name_to_id_map[column_node_name] = column_id
             
             # Adiciona aresta da tabela para a coluna
-            if real_table_name in name_to_id_map:
-                table_id = name_to_id_map[real_table_name]
-                G.add_edge(table_id, column_id)
+            G.add_edge(name_to_id_map[real_table_name], column_id)
 
     # 3. Adiciona nós de filtro baseados na cláusula WHERE
-    where_clause = ast.find(exp.Where)
-    if where_clause:
-        in_nodes, equals_nodes, notnull_nodes = get_clauses_from_ast(where_clause.this)
-
+    if where_found:
         # Mapeia colunas de volta para seus IDs no grafo
-        all_columns = {c.name: alias_map.get(c.table) for c in ast.find_all(exp.Column)}
+        all_columns = {c.name: alias_map.get(c.table) for c in columns}
         
         # Para cada coluna em uma cláusula, cria um nó de filtro e o conecta
-        for col_name in equals_nodes:
-            table_name = all_columns.get(col_name)
-            column_node_name = f"{table_name}.{col_name}"
-            if column_node_name in name_to_id_map:
-                column_id = name_to_id_map[column_node_name]
-                filter_id = G.add_node(node_type='FILTER', label='EQUALS')
-                G.add_edge(column_id, filter_id)
-
-        for col_name in in_nodes:
-            table_name = all_columns.get(col_name)
-            column_node_name = f"{table_name}.{col_name}"
-            if column_node_name in name_to_id_map:
-                column_id = name_to_id_map[column_node_name]
-                filter_id = G.add_node(node_type='FILTER', label='IN')
-                G.add_edge(column_id, filter_id)
-
-        for col_name in notnull_nodes:
-            table_name = all_columns.get(col_name)
-            column_node_name = f"{table_name}.{col_name}"
-            if column_node_name in name_to_id_map:
-                column_id = name_to_id_map[column_node_name]
-                filter_id = G.add_node(node_type='FILTER', label='NOT_NULL')
-                G.add_edge(column_id, filter_id)
-            
-    return G
+        for col_names, filter_label in ((equals_nodes, 'EQUALS'), (in_nodes, 'IN'),
+                                        (notnull_nodes, 'NOT_NULL')):
+            for col_name in col_names:
+                table_name = all_columns.get(col_name)
+                column_node_name = f"{table_name}.{col_name}"
+                if column_node_name in name_to_id_map:
+                    column_id = name_to_id_map[column_node_name]
+                    filter_id = G.add_node(node_type='FILTER', label=filter_label)
+                    G.add_edge(column_id, filter_id)
+
+    # O grafo está completo: congela para que possa ser compartilhado sem cópias
+    return G.freeze()
 
 # --- Demonstração de uso ---
 if __name__ == "__main__":
+    from visualizer import visualize_custom_graph # Opcional, para visualização
+
     sql_query = "SELECT u.id, u.name FROM users u WHERE u.status = 'active' AND u.age IS NOT NULL"
     
     print(f"Gerando grafo para a query: {sql_query}\n")
@@ -114,6 +142,6 @@ if __name__ == "__main__":
         print("\n--- Arestas do Grafo Gerado (Lista de Adjacência) ---")
         for node_id, neighbors in my_graph.adjacency_list.items():
             if neighbors:
-                print(f"Nó {node_id} -> {neighbors}")
+                print(f"Nó {node_id} -> {set(neighbors)}")
                 
         visualize_custom_graph(my_graph)
\ No newline at end of file
@@ -0,0 +1,83 @@
+from collections import Counter
+from hashlib import blake2b
+
+from graph_structures import Graph
+
+def _stable_hash(text: str) -> int:
+    """Hash de 64 bits estável entre processos (ao contrário de `hash`)."""
+    return int.from_bytes(blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def label_histogram(graph: Graph) -> Counter:
+    """Histograma de nós por chave semântica (tipo, rótulo)."""
+    return Counter(graph.label_counts())
+
+def wl_subtree_hashes(graph: Graph, iterations=2) -> Counter:
+    """
+    Multiconjunto de rótulos Weisfeiler-Lehman do grafo.
+
+    A cor inicial de cada nó é o par (tipo, rótulo); a cada iteração a cor é
+    recombinada com as cores ordenadas dos sucessores e dos predecessores.
+    O resultado conta as cores de todas as iterações, de 0 a `iterations`.
+    """
+    colors = {node_id: _stable_hash(f"{node.node_type}:{node.label}")
+              for node_id, node in graph.nodes.items()}
+    hashes = Counter(colors.values())
+    for _ in range(iterations):
+        colors = {
+            node_id: _stable_hash(
+                f"{color}|{sorted(colors[n] for n in graph.adjacency_list[node_id])}"
+                f"|{sorted(colors[n] for n in graph.get_predecessors(node_id))}")
+            for node_id, color in colors.items()
+        }
+        hashes.update(colors.values())
+    return hashes
+
+def mcs_size_upper_bound(histogram_a: Counter, histogram_b: Counter) -> int:
+    """
+    Limite superior para o número de nós do MCS: cada nó só casa com outro de
+    mesma chave, então há no máximo min(ocorrências) pares por chave.
+    """
+    if len(histogram_a) > len(histogram_b):
+        histogram_a, histogram_b = histogram_b, histogram_a
+    return sum(min(count, histogram_b[key]) for key, count in histogram_a.items())
+
+def similarity_upper_bound(histogram_a: Counter, histogram_b: Counter) -> float:
+    """Limite superior para `calculate_similarity_percentage` entre os dois grafos."""
+    denominator = min(sum(histogram_a.values()), sum(histogram_b.values()))
+    if denominator == 0:
+        return 0.0
+    return mcs_size_upper_bound(histogram_a, histogram_b) / denominator * 100
+
+def wl_similarity(features_a: Counter, features_b: Counter, normalization='cosine') -> float:
+    """
+    Similaridade aproximada (0 a 100) entre os vetores de rótulos WL de dois
+    grafos (ver `wl_subtree_hashes`), pelo kernel WL de subárvores normalizado.
+
+    Args:
+        normalization: 'cosine' usa k(a, b) / sqrt(k(a, a) k(b, b)), com k o
+            produto interno das contagens; 'min' divide a interseção dos dois
+            multiconjuntos pelo total do menor, como `calculate_similarity_percentage`
+            (quanto do grafo menor está no maior).
+    """
+    if not features_a or not features_b:
+        return 0.0
+    if len(features_a) > len(features_b):
+        features_a, features_b = features_b, features_a
+    if normalization == 'min':
+        shared = sum(min(count, features_b[key]) for key, count in features_a.items())
+        return shared / min(sum(features_a.values()), sum(features_b.values())) * 100
+    if normalization == 'cosine':
+        dot = sum(count * features_b[key] for key, count in features_a.items())
+        norms = (sum(c * c for c in features_a.values()) * sum(c * c for c in features_b.values()))
+        # Arredondamentos podem passar de 100 em vetores idênticos
+        return min(dot / norms ** 0.5 * 100, 100.0)
+    raise ValueError(f"Normalização desconhecida: {normalization!r}")
+
+def approximate_similarity_percentage(g1: Graph, g2: Graph, iterations=1,
+                                      normalization='cosine') -> float:
+    """
+    Versão aproximada de `calculate_similarity_percentage`, sem MCS: compara os
+    rótulos Weisfeiler-Lehman dos dois grafos (ver `wl_similarity`).
+    """
+    return wl_similarity(wl_subtree_hashes(g1, iterations), wl_subtree_hashes(g2, iterations),
+                         normalization)
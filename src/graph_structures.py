@@ -1,9 +1,20 @@
+import sys
+from array import array
+from collections.abc import Mapping
+from hashlib import blake2b
+
+def _intern(text):
+    """Interna strings (tipos e rótulos se repetem muito entre grafos)."""
+    return sys.intern(text) if type(text) is str else text
+
 class Node:
     """Represents a node in the query graph."""
+    __slots__ = ('node_id', 'node_type', 'label', 'value', 'is_selected')
+
     def __init__(self, node_id, node_type, label, value=None, is_selected=False):
         self.node_id = node_id
-        self.node_type = node_type
-        self.label = label
+        self.node_type = _intern(node_type)
+        self.label = _intern(label)
         self.value = value
         self.is_selected = is_selected
 
@@ -25,10 +36,16 @@ class Graph:
     def __init__(self):
         self.nodes = {}
         self.adjacency_list = {}
+        # Índice reverso (predecessores) mantido junto da lista de adjacência
+        self.predecessor_list = {}
         self._next_node_id = 0
+        self.frozen = False
+        self._subtree_hashes = None # Calculados sob demanda em grafos congelados
 
     def add_node(self, node_type, label, value=None, is_selected=False):
         """Adds a new node to the graph and returns its ID."""
+        if self.frozen:
+            raise ValueError("Cannot modify a frozen graph.")
         node_id = self._next_node_id
         
         
@@ -36,13 +53,17 @@ class Graph:
         
         self.nodes[node_id] = new_node
         self.adjacency_list[node_id] = set()
+        self.predecessor_list[node_id] = set()
         self._next_node_id += 1
         return node_id
 
     def add_edge(self, from_node_id, to_node_id):
         """Adds a directed edge between two nodes."""
+        if self.frozen:
+            raise ValueError("Cannot modify a frozen graph.")
         if from_node_id in self.adjacency_list and to_node_id in self.nodes:
             self.adjacency_list[from_node_id].add(to_node_id)
+            self.predecessor_list[to_node_id].add(from_node_id)
         else:
             raise ValueError("One or both nodes not in the graph.")
 
@@ -55,12 +76,86 @@ class Graph:
         return self.adjacency_list.get(node_id, set())
     
     def get_predecessors(self, node_id):
-        """Returns a set of predecessor IDs for a given node."""
-        predecessors = set()
-        for u, neighbors in self.adjacency_list.items():
-            if node_id in neighbors:
-                predecessors.add(u)
-        return predecessors
+        """
+        Returns a set of predecessor IDs for a given node.
+        Frozen graphs return the (immutable) index entry itself, without copying.
+        """
+        predecessors = self.predecessor_list.get(node_id, frozenset())
+        return predecessors if self.frozen else set(predecessors)
+
+    def label_counts(self) -> dict:
+        """Conta os nós por chave semântica (tipo, rótulo)."""
+        counts = {}
+        for node in self.nodes.values():
+            key = (node.node_type, node.label)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def equivalence_classes(self) -> list:
+        """
+        Agrupa nós intercambiáveis: mesmo tipo, mesmo rótulo e exatamente os
+        mesmos sucessores e predecessores. Trocar dois nós de uma classe é um
+        automorfismo do grafo.
+
+        Returns:
+            Lista das classes com mais de um nó, cada uma com os ids em ordem crescente.
+        """
+        classes = {}
+        for node_id, node in self.nodes.items():
+            signature = (node.node_type, node.label,
+                         frozenset(self.adjacency_list[node_id]),
+                         frozenset(self.predecessor_list[node_id]))
+            classes.setdefault(signature, []).append(node_id)
+        return [sorted(members) for members in classes.values() if len(members) > 1]
+
+    def subtree_hashes(self) -> dict:
+        """
+        Hash canônico de cada subárvore (o nó e todos os seus descendentes) de
+        um grafo em forma de floresta: subárvores com os mesmos tipos e rótulos
+        na mesma estrutura têm o mesmo hash, em qualquer grafo e processo.
+
+        Em grafos congelados o resultado é calculado uma única vez.
+
+        Returns:
+            Dicionário id do nó -> hash (string hexadecimal).
+
+        Raises:
+            ValueError: Se o grafo não for uma floresta.
+        """
+        if self._subtree_hashes is not None:
+            return self._subtree_hashes
+
+        # Ordem topológica a partir das raízes; os filhos são resolvidos antes dos pais
+        if any(len(predecessors) > 1 for predecessors in self.predecessor_list.values()):
+            raise ValueError("Subtree hashes are only defined for forests.")
+        order = [n for n in self.nodes if not self.predecessor_list[n]]
+        for node_id in order:
+            order.extend(self.adjacency_list[node_id])
+        if len(order) != len(self.nodes):
+            raise ValueError("Subtree hashes are only defined for forests.")
+
+        hashes = {}
+        for node_id in reversed(order):
+            node = self.nodes[node_id]
+            children = sorted(hashes[child] for child in self.adjacency_list[node_id])
+            text = '\x1f'.join([str(node.node_type), str(node.label)] + children)
+            hashes[node_id] = blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+        if self.frozen:
+            self._subtree_hashes = hashes
+        return hashes
+
+    def freeze(self) -> 'Graph':
+        """
+        Torna o grafo somente leitura: os conjuntos de vizinhos e predecessores
+        passam a ser frozensets e novas inserções levantam ValueError. Consumidores
+        como o VF2Matcher podem então usar esses conjuntos sem cópias defensivas.
+        """
+        if not self.frozen:
+            self.adjacency_list = {k: frozenset(v) for k, v in self.adjacency_list.items()}
+            self.predecessor_list = {k: frozenset(v) for k, v in self.predecessor_list.items()}
+            self.frozen = True
+        return self
     
     def subgraph(self, node_ids_to_keep: list) -> 'Graph':
         """
@@ -95,4 +190,212 @@ class Graph:
 
     def __repr__(self):
         return (f"Graph(nodes={len(self.nodes)}, "
-                f"edges={sum(len(v) for v in self.adjacency_list.values())})")
\ No newline at end of file
+                f"edges={sum(len(v) for v in self.adjacency_list.values())})")
+
+class StringTable:
+    """
+    Tabela de strings compartilhada: cada tipo ou rótulo distinto é guardado
+    uma única vez e referido pelos grafos compactos por um id inteiro.
+    """
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, string_id):
+        return self.strings[string_id]
+
+    def intern(self, text) -> int:
+        """Id da string, criando um novo se ela ainda não está na tabela."""
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = self.ids[text] = len(self.strings)
+            self.strings.append(_intern(text))
+        return string_id
+
+    def truncate(self, size):
+        """Descarta as strings com id >= size (internadas e depois abandonadas)."""
+        for text in self.strings[size:]:
+            del self.ids[text]
+        del self.strings[size:]
+
+# Tabela usada por padrão por todos os grafos compactos do processo
+STRINGS = StringTable()
+
+def _int_array(values) -> array:
+    """Array com o menor tipo inteiro sem sinal que comporta os valores."""
+    values = list(values)
+    largest = max(values, default=0)
+    typecode = 'B' if largest < 1 << 8 else 'H' if largest < 1 << 16 else 'L'
+    return array(typecode, values)
+
+class _NodeView(Mapping):
+    """Visão id -> Node de um CompactGraph; os Nodes são criados sob demanda."""
+    __slots__ = ('_graph',)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getitem__(self, node_id):
+        graph = self._graph
+        if type(node_id) is not int or not 0 <= node_id < len(graph.node_types):
+            raise KeyError(node_id)
+        strings = graph.strings
+        value = graph.values.get(node_id) if graph.values else None
+        return Node(node_id, strings[graph.node_types[node_id]], strings[graph.labels[node_id]],
+                    value, node_id in graph.selected)
+
+    def __iter__(self):
+        return iter(range(len(self._graph.node_types)))
+
+    def __len__(self):
+        return len(self._graph.node_types)
+
+class _NeighborView(Mapping):
+    """
+    Visão id -> frozenset de vizinhos sobre um par de arrays CSR: os vizinhos
+    do nó i são targets[offsets[i]:offsets[i + 1]].
+    """
+    __slots__ = ('_offsets', '_targets')
+
+    def __init__(self, offsets, targets):
+        self._offsets = offsets
+        self._targets = targets
+
+    def __getitem__(self, node_id):
+        if type(node_id) is not int or not 0 <= node_id < len(self._offsets) - 1:
+            raise KeyError(node_id)
+        return frozenset(self._targets[self._offsets[node_id]:self._offsets[node_id + 1]])
+
+    def __iter__(self):
+        return iter(range(len(self._offsets) - 1))
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+def _csr(neighbor_sets):
+    """(offsets, targets) da lista de conjuntos de vizinhos, em ordem de nó."""
+    offsets = [0]
+    targets = []
+    for neighbors in neighbor_sets:
+        targets.extend(sorted(neighbors))
+        offsets.append(len(targets))
+    return _int_array(offsets), _int_array(targets)
+
+class CompactGraph:
+    """
+    Grafo somente leitura em formato compacto, para manter muitos grafos em
+    memória (ex: um corpus de busca). Tipos e rótulos viram ids de uma
+    `StringTable` compartilhada, e sucessores e predecessores ficam em arrays
+    de inteiros no formato CSR (offsets + alvos).
+
+    Expõe a mesma interface de leitura de um Graph congelado (`nodes`,
+    `adjacency_list`, `predecessor_list`, `get_predecessors`, `subgraph`,
+    `subtree_hashes`...), então o VF2Matcher, o ForestMCSMatcher e o
+    visualizador o aceitam diretamente. Os nós são numerados de 0 a n-1.
+    """
+    __slots__ = ('node_types', 'labels', 'successor_offsets', 'successors',
+                 'predecessor_offsets', 'predecessors', 'strings', 'values', 'selected',
+                 'nodes', 'adjacency_list', 'predecessor_list', '_subtree_hashes')
+
+    frozen = True
+
+    def __init__(self, node_types, labels, successor_offsets, successors,
+                 predecessor_offsets, predecessors, strings=None, values=None, selected=()):
+        self.node_types = node_types
+        self.labels = labels
+        self.successor_offsets = successor_offsets
+        self.successors = successors
+        self.predecessor_offsets = predecessor_offsets
+        self.predecessors = predecessors
+        self.strings = STRINGS if strings is None else strings
+        self.values = values # Dicionário esparso id -> value (None na maioria dos grafos)
+        self.selected = frozenset(selected)
+        self.nodes = _NodeView(self)
+        self.adjacency_list = _NeighborView(successor_offsets, successors)
+        self.predecessor_list = _NeighborView(predecessor_offsets, predecessors)
+        self._subtree_hashes = None
+
+    @classmethod
+    def from_graph(cls, graph, strings=None) -> 'CompactGraph':
+        """Converte um Graph (ou outro CompactGraph), renumerando os nós em ordem de id."""
+        strings = STRINGS if strings is None else strings
+        order = sorted(graph.nodes)
+        new_ids = {old_id: new_id for new_id, old_id in enumerate(order)}
+        nodes = [graph.nodes[old_id] for old_id in order]
+
+        successor_offsets, successors = _csr(
+            [new_ids[n] for n in graph.adjacency_list[old_id]] for old_id in order)
+        predecessor_offsets, predecessors = _csr(
+            [new_ids[n] for n in graph.predecessor_list[old_id]] for old_id in order)
+        values = {new_id: node.value for new_id, node in enumerate(nodes)
+                  if node.value is not None}
+        return cls(_int_array(strings.intern(node.node_type) for node in nodes),
+                   _int_array(strings.intern(node.label) for node in nodes),
+                   successor_offsets, successors, predecessor_offsets, predecessors,
+                   strings=strings, values=values or None,
+                   selected=[new_id for new_id, node in enumerate(nodes) if node.is_selected])
+
+    def to_graph(self) -> Graph:
+        """Cópia mutável como Graph (com os mesmos ids de nó)."""
+        return Graph.subgraph(self, list(self.nodes))
+
+    def expanded(self) -> Graph:
+        """
+        Graph congelado equivalente (mesmos ids), para buscas que consultam
+        vizinhos e nós a cada passo. Os hashes de subárvore já calculados vão junto.
+        """
+        graph = self.to_graph().freeze()
+        graph._subtree_hashes = self._subtree_hashes
+        return graph
+
+    def subgraph(self, node_ids_to_keep: list) -> 'CompactGraph':
+        """Como `Graph.subgraph`, mas o resultado também é compacto."""
+        return CompactGraph.from_graph(Graph.subgraph(self, node_ids_to_keep), self.strings)
+
+    def freeze(self) -> 'CompactGraph':
+        return self
+
+    def add_node(self, *args, **kwargs):
+        raise ValueError("Cannot modify a frozen graph.")
+
+    add_edge = add_node
+
+    # Algoritmos de leitura compartilhados com Graph: só usam as visões acima
+    get_node = Graph.get_node
+    get_neighbors = Graph.get_neighbors
+    get_predecessors = Graph.get_predecessors
+    label_counts = Graph.label_counts
+    equivalence_classes = Graph.equivalence_classes
+    subtree_hashes = Graph.subtree_hashes
+    __len__ = Graph.__len__
+
+    def __repr__(self):
+        return f"CompactGraph(nodes={len(self.node_types)}, edges={len(self.successors)})"
+
+    def __reduce__(self):
+        # Os ids de string só valem na tabela deste processo: a cópia serializada
+        # leva as próprias strings e é reinternada ao ser carregada. Os arrays
+        # CSR são copiados, pois podem ser visões de um arquivo mapeado
+        used = sorted(set(self.node_types) | set(self.labels))
+        local = {string_id: position for position, string_id in enumerate(used)}
+        return (_load_compact, ([self.strings[string_id] for string_id in used],
+                                [local[i] for i in self.node_types], [local[i] for i in self.labels],
+                                *(_int_array(column) for column in (
+                                    self.successor_offsets, self.successors,
+                                    self.predecessor_offsets, self.predecessors)),
+                                self.values, sorted(self.selected)))
+
+def _load_compact(strings, node_types, labels, successor_offsets, successors,
+                  predecessor_offsets, predecessors, values, selected):
+    """Reconstrói um CompactGraph serializado na tabela de strings deste processo."""
+    ids = [STRINGS.intern(text) for text in strings]
+    return CompactGraph(_int_array(ids[i] for i in node_types), _int_array(ids[i] for i in labels),
+                        successor_offsets, successors, predecessor_offsets, predecessors,
+                        values=values, selected=selected)
+
+def expand_graph(graph):
+    """Expande grafos compactos (`CompactGraph.expanded`); os demais passam direto."""
+    return graph.expanded() if isinstance(graph, CompactGraph) else graph
@@ -0,0 +1,144 @@
+from array import array
+
+from graph_structures import Graph
+
+class LabelEncoder:
+    """
+    Codifica chaves semânticas (tipo, rótulo) como inteiros consecutivos, para
+    que comparações de rótulos virem comparações de inteiros.
+    """
+    def __init__(self):
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def encode(self, key) -> int:
+        """Id da chave, criando um novo se ela ainda não foi vista."""
+        label_id = self.ids.get(key)
+        if label_id is None:
+            label_id = self.ids[key] = len(self.ids)
+        return label_id
+
+    def get(self, key):
+        """Id da chave, ou None se ela nunca foi codificada."""
+        return self.ids.get(key)
+
+def encode_labels(graph: Graph, encoder: LabelEncoder) -> dict:
+    """Mapeia cada nó do grafo para o id inteiro da sua chave (tipo, rótulo)."""
+    return {node_id: encoder.encode((node.node_type, node.label))
+            for node_id, node in graph.nodes.items()}
+
+def encode_pair(g1: Graph, g2: Graph):
+    """
+    Codifica os rótulos de dois grafos com um mesmo codificador, uma única vez
+    por comparação.
+
+    Returns:
+        (rótulos de g1, rótulos de g2), como dicionários nó -> id inteiro.
+    """
+    encoder = LabelEncoder()
+    return encode_labels(g1, encoder), encode_labels(g2, encoder)
+
+def _numpy():
+    """Importa o numpy sob demanda; None se ele não estiver instalado."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def numpy_available() -> bool:
+    """True se o numpy puder ser importado (as operações em lote ficam vetorizadas)."""
+    return _numpy() is not None
+
+class LabelMatrix:
+    """
+    Histogramas de rótulos de muitos grafos, guardados em formato esparso por
+    linhas (CSR): ids de rótulo, contagens e o início de cada linha.
+
+    `overlaps` calcula, para uma query, a sobreposição de rótulos com todos os
+    grafos de uma vez, vetorizada com numpy quando ele estiver instalado.
+    """
+    def __init__(self, encoder: LabelEncoder = None):
+        self.encoder = encoder or LabelEncoder()
+        self.label_ids = array('i')
+        self.counts = array('i')
+        self.row_starts = array('i', [0])
+        self._arrays = None # Visões numpy dos arrays, refeitas após novas linhas
+
+    def __len__(self):
+        return len(self.row_starts) - 1
+
+    def add(self, histogram) -> int:
+        """Adiciona o histograma {(tipo, rótulo): contagem} de um grafo e retorna sua linha."""
+        # Solta as visões numpy antes: um array exportando seu buffer não cresce
+        self._arrays = None
+        for key, count in histogram.items():
+            self.label_ids.append(self.encoder.encode(key))
+            self.counts.append(count)
+        self.row_starts.append(len(self.label_ids))
+        return len(self) - 1
+
+    def _query_counts(self, histogram) -> dict:
+        """Contagens da query indexadas pelo id de rótulo (rótulos novos são ignorados)."""
+        query = {}
+        for key, count in histogram.items():
+            label_id = self.encoder.get(key)
+            if label_id is not None:
+                query[label_id] = count
+        return query
+
+    def _row_reduce(self, histogram, combine, as_array):
+        """
+        Para cada linha, soma de combine(contagem na query, contagem na linha)
+        sobre os rótulos em comum. `combine` é o nome da ufunc do numpy
+        ('minimum' ou 'multiply').
+        """
+        query = self._query_counts(histogram)
+        np = _numpy()
+        if np is None:
+            pairwise = min if combine == 'minimum' else lambda a, b: a * b
+            results = []
+            for row in range(len(self)):
+                total = 0
+                for position in range(self.row_starts[row], self.row_starts[row + 1]):
+                    count = query.get(self.label_ids[position])
+                    if count:
+                        total += pairwise(count, self.counts[position])
+                results.append(total)
+            return results
+
+        if not query or not len(self):
+            results = np.zeros(len(self), dtype=np.int64)
+            return results if as_array else results.tolist()
+        if self._arrays is None:
+            self._arrays = (np.frombuffer(self.label_ids, dtype=np.int32),
+                            np.frombuffer(self.counts, dtype=np.int32),
+                            np.frombuffer(self.row_starts, dtype=np.int32))
+        label_ids, counts, row_starts = self._arrays
+        query_counts = np.zeros(len(self.encoder), dtype=np.int64)
+        query_counts[list(query)] = list(query.values())
+        combined = getattr(np, combine)(counts, query_counts[label_ids])
+        # Soma por linha; reduceat só vale para linhas com ao menos um rótulo
+        # (numa linha vazia ele leria além do fim ou somaria a linha seguinte)
+        results = np.zeros(len(self), dtype=np.int64)
+        starts = row_starts[:-1]
+        filled = starts < row_starts[1:]
+        if filled.any():
+            results[filled] = np.add.reduceat(combined, starts[filled])
+        return results if as_array else results.tolist()
+
+    def overlaps(self, histogram, as_array=False):
+        """
+        Para cada linha, soma de min(contagem na query, contagem na linha) sobre
+        os rótulos: o limite superior de pares do MCS por chave.
+
+        Com `as_array=True` e numpy instalado, devolve um array numpy em vez de
+        uma lista.
+        """
+        return self._row_reduce(histogram, 'minimum', as_array)
+
+    def dots(self, histogram, as_array=False):
+        """Produto interno das contagens da query com as de cada linha (ver `overlaps`)."""
+        return self._row_reduce(histogram, 'multiply', as_array)
@@ -1,22 +1,29 @@
 import argparse
+import contextlib
+import json
 import os
+import sys
 from graph_generator import generate_graph_from_sql
-from graph_generator import generate_graph_from_sql
-from visualizer import visualize_custom_graph
-from mcs_finder import find_maximum_common_subgraph, calculate_similarity_percentage
+from mcs_finder import find_mcs_result, calculate_similarity_percentage, calculate_similarity_interval
+from similarity_matrix import compute_similarity_matrix, write_matrix
+from graph_cache import GraphCache
+from graph_corpus import GraphCorpus
+from query_index import QueryIndex
+from query_stream import QUERY_FORMATS, iter_sql_statements, iter_queries, iter_pairs, iter_comparisons
+from search_stats import SearchStats
 
-def read_queries_from_file(filepath: str) -> list:
+def read_queries_from_file(filepath: str, expected_count=2) -> list:
     """
-    Lê duas queries de um arquivo de texto.
+    Lê as queries de um arquivo de texto.
     As queries devem ser separadas por um ponto e vírgula ';'.
+    Com expected_count=None, aceita qualquer quantidade de queries.
     """
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            # Filtra strings vazias que podem surgir de múltiplos ';'
-            queries = [q.strip() for q in content.split(';') if q.strip()]
-            if len(queries) != 2:
-                print(f"Erro: O arquivo '{filepath}' deve conter exatamente 2 queries SQL separadas por ';'.")
+            # O tokenizador ignora ';' dentro de literais e comentários
+            queries = list(iter_sql_statements(f))
+            if expected_count is not None and len(queries) != expected_count:
+                print(f"Erro: O arquivo '{filepath}' deve conter exatamente {expected_count} queries SQL separadas por ';'.")
                 return None
             return queries
     except FileNotFoundError:
@@ -26,6 +33,150 @@ def read_queries_from_file(filepath: str) -> list:
         print(f"Ocorreu um erro ao ler o arquivo: {e}")
         return None
 
+def run_matrix_mode(args):
+    """
+    Modo matriz: lê N queries de todos os arquivos e calcula a similaridade
+    entre todos os pares.
+    """
+    queries = []
+    for filepath in args.files:
+        try:
+            queries.extend(iter_queries(filepath, args.format))
+        except FileNotFoundError:
+            print(f"Erro: Arquivo '{filepath}' não encontrado.")
+
+    if len(queries) < 2:
+        print("Erro: são necessárias pelo menos 2 queries para o modo --matrix.")
+        return
+
+    print(f"Calculando a matriz de similaridade para {len(queries)} queries...")
+    matrix = compute_similarity_matrix(queries, workers=args.workers, chunk_size=args.chunk_size)
+    write_matrix(matrix, args.matrix)
+    print(f"Matriz {len(queries)}x{len(queries)} gravada em '{args.matrix}'.")
+
+def run_stream_mode(args):
+    """
+    Modo streaming: lê os logs sob demanda e compara as queries em pares
+    consecutivos (ou cada uma contra --reference), imprimindo um resultado por
+    par. O uso de memória não depende do tamanho dos arquivos.
+    """
+    cache = GraphCache()
+
+    def all_queries():
+        for filepath in args.files:
+            try:
+                yield from iter_queries(filepath, args.format)
+            except FileNotFoundError:
+                print(f"Erro: Arquivo '{filepath}' não encontrado.")
+
+    if args.reference:
+        pairs = ((args.reference, sql) for sql in all_queries())
+    else:
+        pairs = iter_pairs(all_queries())
+
+    if args.render:
+        # Relatório visual: cada par vira uma imagem, desenhada em paralelo
+        from visualizer import render_pairs
+        rows = render_pairs(pairs, args.render, fmt=args.render_format, workers=args.workers,
+                            progress=lambda done: print(f"\rPares desenhados: {done}", end='',
+                                                        file=sys.stderr, flush=True))
+        print(file=sys.stderr)
+        print(f"{len(rows)} pares gravados em '{args.render}' (ver index.csv).")
+        return
+
+    for number, (sql_a, sql_b, similarity, mcs_size) in enumerate(iter_comparisons(pairs, cache), start=1):
+        print(f"[{number}] {similarity:.2f}% (MCS com {mcs_size} nós) | A: {sql_a} | B: {sql_b}")
+
+def run_search_mode(args):
+    """
+    Modo busca: indexa as queries dos arquivos e mostra as --top-k mais
+    similares à query passada em --search.
+    """
+    index = QueryIndex()
+    if args.corpus:
+        index.add_corpus(GraphCorpus(args.corpus, create=False))
+    for filepath in args.files:
+        try:
+            for sql in iter_queries(filepath, args.format):
+                index.add(sql)
+        except FileNotFoundError:
+            print(f"Erro: Arquivo '{filepath}' não encontrado.")
+
+    results = index.search(args.search, k=args.top_k)
+    print(f"Top {args.top_k} entre {len(index)} queries indexadas "
+          f"({index.exact_evaluations} comparações exatas):")
+    for rank, (similarity, _, sql) in enumerate(results, start=1):
+        print(f"{rank}. {similarity:.2f}% | {sql}")
+
+def run_serve_mode(args):
+    """
+    Modo serviço: processo de longa duração que atende requisições JSONL
+    (pares de queries ou uma query contra um corpus) com caches aquecidos.
+    """
+    # Importado só aqui: asyncio e o pool de processos só interessam ao serviço
+    from service import run_service
+
+    def corpus_queries():
+        for filepath in args.files:
+            try:
+                yield from iter_queries(filepath, args.format)
+            except FileNotFoundError:
+                print(f"Erro: Arquivo '{filepath}' não encontrado.", file=sys.stderr)
+
+    run_service(corpus_queries(), socket_path=args.socket, workers=args.workers,
+                corpus_path=args.corpus)
+
+def run_build_corpus_mode(args):
+    """
+    Modo corpus: gera os grafos das queries dos arquivos e os anexa ao corpus
+    em disco, para que as próximas execuções (--corpus) não refaçam o parsing.
+    """
+    corpus = GraphCorpus(args.build_corpus)
+    cache = GraphCache()
+    before = len(corpus)
+    for filepath in args.files:
+        try:
+            # Um segmento por arquivo: o que já foi gravado não é refeito se um falhar
+            with contextlib.redirect_stdout(sys.stderr):
+                added = corpus.add_queries(iter_queries(filepath, args.format), cache)
+        except FileNotFoundError:
+            print(f"Erro: Arquivo '{filepath}' não encontrado.")
+            continue
+        print(f"{os.path.basename(filepath)}: {added} grafos novos.")
+    print(f"Corpus '{args.build_corpus}': {len(corpus)} grafos ({len(corpus) - before} novos).")
+
+def run_json_mode(args):
+    """
+    Modo JSON: para cada arquivo de caso, imprime uma linha JSON com a
+    similaridade, o tamanho do MCS e as estatísticas de cada etapa.
+    """
+    for filepath in args.files:
+        record = {'case': os.path.basename(filepath)}
+        queries = read_queries_from_file(filepath)
+        if not queries:
+            record['error'] = "arquivo inválido"
+            print(json.dumps(record))
+            continue
+
+        stats = SearchStats()
+        graph_a = generate_graph_from_sql(queries[0], stats=stats)
+        graph_b = generate_graph_from_sql(queries[1], stats=stats)
+        if graph_a is None or graph_b is None:
+            record['error'] = "falha no parsing"
+            print(json.dumps(record))
+            continue
+
+        result = find_mcs_result(graph_a, graph_b, engine=args.engine,
+                                 cross_check=args.cross_check, verbose=False,
+                                 time_budget=args.time_budget, stats=stats,
+                                 workers=args.search_workers)
+        low, high = calculate_similarity_interval(graph_a, graph_b, result)
+        record.update({'similarity': low, 'similarity_upper_bound': high,
+                       'mcs_nodes': result.size, 'proven_optimal': result.proven_optimal,
+                       'interrupted': result.interrupted,
+                       'stats': stats.to_dict()})
+        print(json.dumps(record))
+
 def main():
     """
     Ponto de entrada principal para a execução da bateria de testes.
@@ -36,7 +187,7 @@ def main():
     parser.add_argument(
         "files",
         metavar="ARQUIVO",
-        nargs='+', # Aceita um ou mais argumentos de arquivo
+        nargs='*', # Aceita um ou mais argumentos de arquivo (nenhum no modo --serve)
         help="Caminho para um ou mais arquivos .txt contendo as queries a serem comparadas."
     )
     parser.add_argument(
@@ -44,9 +195,164 @@ def main():
         action='store_true',
         help="Desativa a exibição da janela de visualização do grafo MCS."
     )
+    parser.add_argument(
+        '--cross-check',
+        action='store_true',
+        help="Confere o resultado do motor de florestas contra a busca VF2 completa."
+    )
+    parser.add_argument(
+        '--engine',
+        choices=['auto', 'forest', 'vf2'],
+        default='auto',
+        help="Motor do MCS: 'auto' usa o motor exato de florestas nos grafos de SQL e "
+             "o VF2 nos demais; 'vf2' não prova otimalidade (pode achar um MCS menor)."
+    )
+    parser.add_argument(
+        '--time-budget',
+        type=float,
+        default=None,
+        metavar="SEGUNDOS",
+        help="Tempo máximo da busca do MCS por par; ao esgotar, mostra o melhor MCS "
+             "encontrado e o intervalo possível de similaridade."
+    )
+
+    parser.add_argument(
+        '--search-workers',
+        type=int,
+        default=1,
+        metavar="N",
+        help="Processos usados pela busca VF2 de cada par (padrão: 1, sequencial)."
+    )
+
+    parser.add_argument(
+        '--matrix',
+        metavar="SAIDA",
+        help="Compara todas as queries dos arquivos entre si e grava a matriz de "
+             "similaridade em SAIDA (.csv ou .npy)."
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help="Número de processos usados nos modos --matrix e --stream --render (padrão: número de CPUs)."
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=256,
+        help="Quantidade de pares por unidade de trabalho no modo --matrix."
+    )
+
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help="Lê os arquivos como logs de queries, sob demanda, e compara as queries "
+             "em pares consecutivos (ou contra --reference)."
+    )
+    parser.add_argument(
+        '--reference',
+        metavar="SQL",
+        help="No modo --stream, compara cada query do log com esta query."
+    )
+    parser.add_argument(
+        '--format',
+        choices=['auto'] + list(QUERY_FORMATS),
+        default='auto',
+        help="Formato dos logs nos modos --stream e --matrix: 'sql' (separadas por ';'), "
+             "'jsonl', 'lines' (uma por linha) ou 'auto' (pela extensão)."
+    )
+
+    parser.add_argument(
+        '--search',
+        metavar="SQL",
+        help="Indexa as queries dos arquivos e lista as mais similares a esta query."
+    )
+    parser.add_argument(
+        '--top-k',
+        type=int,
+        default=5,
+        help="Quantidade de resultados do modo --search."
+    )
+
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help="Modo serviço: atende requisições JSONL pela entrada padrão (ou por --socket), "
+             "mantendo grafos e resultados em cache. Os arquivos viram o corpus 'default'."
+    )
+    parser.add_argument(
+        '--socket',
+        metavar="CAMINHO",
+        help="No modo --serve, atende em um socket Unix local em vez da entrada padrão."
+    )
+
+    parser.add_argument(
+        '--build-corpus',
+        metavar="CORPUS",
+        help="Anexa os grafos das queries dos arquivos ao corpus binário CORPUS (criado se "
+             "não existir). Queries já presentes, pela impressão digital, são ignoradas."
+    )
+    parser.add_argument(
+        '--corpus',
+        metavar="CORPUS",
+        help="Nos modos --search e --serve, carrega os grafos do corpus gerado por "
+             "--build-corpus (mapeado em memória, sem parsing) antes dos arquivos."
+    )
+
+    parser.add_argument(
+        '--render',
+        metavar="DIRETORIO",
+        help="Grava imagens (sem janela) em DIRETORIO: A, B e o MCS lado a lado por par. "
+             "Com --stream, os pares do log são desenhados em paralelo (--workers)."
+    )
+    parser.add_argument(
+        '--render-format',
+        choices=['png', 'svg'],
+        default='png',
+        help="Formato das imagens de --render."
+    )
+
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help="Mostra o tempo de cada etapa (parsing, grafo, MCS) e os contadores da busca."
+    )
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help="Imprime uma linha JSON por caso, com a similaridade e as estatísticas."
+    )
 
     args = parser.parse_args()
 
+    if args.serve:
+        run_serve_mode(args)
+        return
+
+    # A busca pode usar só o corpus em disco
+    if not args.files and not (args.search and args.corpus):
+        parser.error("informe ao menos um ARQUIVO")
+
+    if args.build_corpus:
+        run_build_corpus_mode(args)
+        return
+
+    if args.search:
+        run_search_mode(args)
+        return
+
+    if args.stream:
+        run_stream_mode(args)
+        return
+
+    if args.matrix:
+        run_matrix_mode(args)
+        return
+
+    if args.json:
+        run_json_mode(args)
+        return
+
     for filepath in args.files:
         print(f"--- Processando Caso de Teste: {os.path.basename(filepath)} ---")
         
@@ -58,8 +364,9 @@ def main():
         sql_a, sql_b = queries
         
         # Geração dos grafos
-        graph_a = generate_graph_from_sql(sql_a)
-        graph_b = generate_graph_from_sql(sql_b)
+        stats = SearchStats() if args.stats else None
+        graph_a = generate_graph_from_sql(sql_a, stats=stats)
+        graph_b = generate_graph_from_sql(sql_b, stats=stats)
 
         print(f"Query A: {sql_a}")
         print(f"Query B: {sql_b}")
@@ -67,17 +374,38 @@ def main():
         print(f"Grafo B: {graph_b}")
 
         # Encontrar MCS e calcular similaridade
-        mcs = find_maximum_common_subgraph(graph_a, graph_b)
+        result = find_mcs_result(graph_a, graph_b, engine=args.engine,
+                                 cross_check=args.cross_check,
+                                 time_budget=args.time_budget, stats=stats,
+                                 workers=args.search_workers)
+        mcs = result.graph
 
         if mcs and len(mcs.nodes) > 0:
             similarity = calculate_similarity_percentage(graph_a, graph_b, mcs)
             print(f"\n✅ Nível de Equivalência: {similarity:.2f}%")
             print(f"   (Encontrado um MCS com {len(mcs.nodes)} nós)")
-            if not args.no_visualize:
+            if result.interrupted:
+                low, high = calculate_similarity_interval(graph_a, graph_b, result)
+                print(f"   (Busca interrompida pelo orçamento: similaridade entre "
+                      f"{low:.2f}% e {high:.2f}%)")
+            if args.render:
+                # Importado só aqui: o matplotlib é caro de carregar
+                from visualizer import render_pair
+                os.makedirs(args.render, exist_ok=True)
+                name = os.path.splitext(os.path.basename(filepath))[0]
+                path = os.path.join(args.render, f"{name}.{args.render_format}")
+                render_pair(graph_a, graph_b, result, path, title=f"{name}: {similarity:.2f}%")
+                print(f"   (Imagem gravada em '{path}')")
+            elif not args.no_visualize:
+                # Importado só aqui: o matplotlib é caro de carregar
+                from visualizer import visualize_custom_graph
                 visualize_custom_graph(mcs, f"MCS - {os.path.basename(filepath)}")
         else:
             print("\n❌ Nível de Equivalência: 0.00%")
             print("   (Nenhum subgrafo comum significativo encontrado)")
+
+        if stats is not None:
+            print(f"\n📊 {stats}")
         
         print("-" * (len(os.path.basename(filepath)) + 29) + "\n")
 
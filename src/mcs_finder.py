@@ -1,32 +1,715 @@
-from graph_structures import Graph
-from vf2 import VF2Matcher
+import time
+from contextlib import nullcontext
 
-def find_maximum_common_subgraph(g1: Graph, g2: Graph):
+from graph_structures import Graph, expand_graph
+from label_encoding import encode_pair
+from lru_cache import LRUCache
+from vf2 import VF2Matcher, InstrumentedVF2Matcher
+
+# Tamanho do MCS entre pares de componentes (subárvores de tabela), indexado
+# pelos hashes canônicos das duas subárvores; compartilhado entre comparações
+COMPONENT_CACHE = LRUCache(65536)
+
+# ==============================================================================
+# Motor especializado para florestas (QUERY -> TABLE -> COLUMN -> FILTER)
+# ==============================================================================
+
+def is_forest(graph: Graph) -> bool:
+    """
+    Verifica se o grafo é uma floresta direcionada: todo nó tem no máximo um
+    predecessor e todos os nós são alcançáveis a partir das raízes (sem ciclos).
+    """
+    roots = []
+    for node_id in graph.nodes:
+        in_degree = len(graph.predecessor_list[node_id])
+        if in_degree > 1:
+            return False
+        if in_degree == 0:
+            roots.append(node_id)
+
+    visited = 0
+    stack = roots
+    while stack:
+        node_id = stack.pop()
+        visited += 1
+        stack.extend(graph.adjacency_list[node_id])
+    return visited == len(graph.nodes)
+
+def is_common_subgraph(g1: Graph, g2: Graph, mapping: dict) -> bool:
+    """
+    Verifica se `mapping` (nós de g1 -> nós de g2) é um subgrafo comum com a
+    semântica dos motores de MCS: injetivo, com a mesma chave (tipo, rótulo)
+    nos dois lados e com as arestas entre nós mapeados do maior grafo (g1, em
+    caso de empate) presentes no outro.
+    """
+    if len(set(mapping.values())) != len(mapping):
+        return False
+    for u, v in mapping.items():
+        node1, node2 = g1.nodes[u], g2.nodes[v]
+        if (node1.node_type, node1.label) != (node2.node_type, node2.label):
+            return False
+    # Os motores orientam a busca pelo maior grafo: as arestas conferidas são as dele
+    if len(g1.nodes) < len(g2.nodes):
+        g1, g2 = g2, g1
+        mapping = {v: u for u, v in mapping.items()}
+    return all(mapping[child] in g2.adjacency_list[v]
+               for u, v in mapping.items()
+               for child in g1.adjacency_list[u] if child in mapping)
+
+def _max_weight_assignment(weights):
+    """
+    Atribuição bipartida de peso máximo (algoritmo húngaro, O(n²·m)).
+
+    Args:
+        weights: Matriz (lista de listas) n x m de pesos não negativos.
+
+    Returns:
+        Lista de pares (linha, coluna) escolhidos.
+    """
+    n = len(weights)
+    m = len(weights[0]) if n else 0
+    if not n or not m:
+        return []
+
+    # Pesos todos iguais (ex: folhas FILTER): qualquer emparelhamento é ótimo
+    first = weights[0][0]
+    if all(w == first for row in weights for w in row):
+        return [(i, i) for i in range(min(n, m))]
+
+    transposed = n > m
+    if transposed:
+        weights = [list(col) for col in zip(*weights)]
+        n, m = m, n
+
+    # Minimiza o custo negativo; u, v são os potenciais e p[j] a linha em j
+    INF = float('inf')
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [INF] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            delta = INF
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = -weights[i0 - 1][j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    pairs = [(p[j] - 1, j - 1) for j in range(1, m + 1) if p[j]]
+    if transposed:
+        pairs = [(j, i) for i, j in pairs]
+    return sorted(pairs)
+
+class ForestMCSMatcher:
+    """
+    Subgrafo comum máximo exato para grafos em forma de floresta, como os
+    produzidos por `generate_graph_from_sql`, com a mesma semântica do
+    VF2Matcher: nós casados têm a mesma chave (tipo, rótulo), e um nó cujo pai
+    também foi casado fica sob a imagem do pai; um nó cujo pai ficou sem par
+    pode ser casado "solto", com qualquer nó livre de mesma chave.
+
+    Com casamentos soltos, o problema continua NP-difícil mesmo em florestas,
+    e não há programação dinâmica polinomial exata para ele. A busca é um
+    branch-and-bound que só ramifica nos nós internos de g1 (em grafos de SQL,
+    as tabelas e as colunas com filtro), em largura, pais antes dos filhos:
+    cada um é casado com um candidato ou fica sem par. As folhas não ramificam:
+    com os nós internos decididos, o maior casamento delas sai de uma contagem
+    por chave (ver `_adjust`). A mesma contagem, tratando os nós internos ainda
+    não decididos como soltos, é o limite superior de cada ramo, mantido de
+    forma incremental. Candidatos soltos cujas subárvores são idênticas e
+    ainda livres, sob pais que nenhum nó restante pode usar, são
+    intercambiáveis: só o primeiro é tentado.
+
+    A busca parte do mapeamento guloso de `_greedy_mapping` (filhos de pares
+    casados emparelhados por atribuição bipartida de peso máximo, nível a
+    nível), montado a partir dos tamanhos em cache das subárvores (ver
+    `_component_value`).
+
+    Expõe a mesma interface do VF2Matcher (`swapped`, `find_mcs_mapping`,
+    `upper_bound`, `interrupted`, `proven_optimal`, `expansions`). Uma busca
+    completa é ótima (`proven_optimal`); com orçamento (`time_budget` em
+    segundos ou `max_expansions` decisões) ela pode ser interrompida e devolver
+    o melhor mapeamento até ali, com o limite da raiz em `upper_bound`.
+
+    Raises:
+        ValueError: Se algum dos grafos não for uma floresta.
+    """
+    def __init__(self, g1: 'Graph', g2: 'Graph', component_cache=None, time_budget=None,
+                 max_expansions=None):
+        # Grafos compactos são expandidos uma vez por busca, que consulta os
+        # vizinhos a cada passo
+        g1, g2 = expand_graph(g1), expand_graph(g2)
+        # Mesma orientação do VF2Matcher: g1 é o grafo maior
+        if len(g1.nodes) < len(g2.nodes):
+            self.g1, self.g2 = g2, g1
+            self.swapped = True
+        else:
+            self.g1, self.g2 = g1, g2
+            self.swapped = False
+        # Os hashes de subárvore só existem em florestas: servem de verificação
+        self._hashes1 = self.g1.subtree_hashes()
+        self._hashes2 = self.g2.subtree_hashes()
+        self.component_cache = COMPONENT_CACHE if component_cache is None else component_cache
+        self.time_budget = time_budget
+        self.max_expansions = max_expansions
+        self.expansions = 0
+        self.interrupted = False
+        self.proven_optimal = False
+        self.upper_bound = None
+
+    # --------------------------------------------------------------------------
+    # Mapeamento inicial guloso (com o cache de componentes)
+    # --------------------------------------------------------------------------
+
+    def _used_ancestors(self):
+        """Nós de g2 com algum descendente já usado pelo mapeamento."""
+        dirty = set()
+        for v2 in self.used:
+            predecessors = self.g2.predecessor_list[v2]
+            while predecessors:
+                parent = next(iter(predecessors))
+                if parent in dirty:
+                    break
+                dirty.add(parent)
+                predecessors = self.g2.predecessor_list[parent]
+        return dirty
+
+    def _component_value(self, u1, v2):
+        """
+        `_pair_value` consultando antes o cache de componentes. Só vale se a
+        subárvore de v2 não tem nós usados (a de u1 nunca tem: os níveis de g1
+        são processados de cima para baixo).
+        """
+        hash1, hash2 = self._hashes1[u1], self._hashes2[v2]
+        # O tamanho é simétrico: a ordem dos hashes não importa
+        key = (hash1, hash2) if hash1 <= hash2 else (hash2, hash1)
+        value = self.component_cache.get(key)
+        if value is None:
+            value = self._pair_value(u1, v2)
+            self.component_cache.put(key, value)
+        return value
+
+    @staticmethod
+    def _group_children(graph, node_id, excluded=()):
+        """Agrupa os filhos de um nó por chave (tipo, rótulo), em ordem de ID."""
+        groups = {}
+        for child in sorted(graph.adjacency_list[node_id]):
+            if child not in excluded:
+                node = graph.nodes[child]
+                groups.setdefault((node.node_type, node.label), []).append(child)
+        return groups
+
+    def _child_groups(self, u1, v2):
+        """Pares (filhos de u1, filhos livres de v2) de mesma chave."""
+        children2 = self._group_children(self.g2, v2, self.used)
+        return [(group1, children2[child_key])
+                for child_key, group1 in self._group_children(self.g1, u1).items()
+                if child_key in children2]
+
+    def _pair_value(self, u1, v2):
+        """
+        Tamanho da maior subárvore comum enraizada no par (u1, v2), que já tem a
+        mesma chave, com os filhos sempre sob os pais. Guarda em `self._choices`
+        os pares de filhos escolhidos. Calculado de baixo para cima com uma
+        pilha explícita, sem limite de profundidade.
+        """
+        stack = [(u1, v2)]
+        while stack:
+            pair = stack[-1]
+            if pair in self._values:
+                stack.pop()
+                continue
+            groups = self._child_groups(*pair)
+            missing = [(c1, c2) for group1, group2 in groups for c1 in group1
+                       for c2 in group2 if (c1, c2) not in self._values]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+
+            value = 1
+            chosen = []
+            for group1, group2 in groups:
+                weights = [[self._values[(c1, c2)] for c2 in group2] for c1 in group1]
+                for i, j in _max_weight_assignment(weights):
+                    value += weights[i][j]
+                    chosen.append((group1[i], group2[j]))
+            self._values[pair] = value
+            self._choices[pair] = chosen
+        return self._values[(u1, v2)]
+
+    def _materialize(self, mapping, u1, v2):
+        """Adiciona ao mapeamento o par (u1, v2) e, descendo, os filhos escolhidos."""
+        stack = [(u1, v2)]
+        while stack:
+            u1, v2 = stack.pop()
+            # Em florestas genéricas, a mesma chave pode aparecer em profundidades
+            # diferentes de g2 e v2 já ter sido usado por outro par deste nível
+            if v2 in self.used:
+                continue
+            mapping[u1] = v2
+            self.used.add(v2)
+            stack.extend(self._choices[(u1, v2)])
+
+    def _greedy_mapping(self):
+        """
+        Mapeamento inicial, nível a nível: os nós livres de g1 cujo pai também
+        ficou livre são emparelhados com os nós livres de g2 por atribuição de
+        peso máximo, onde o peso de um par é o tamanho da maior subárvore comum
+        enraizada nele; os pares escolhidos levam junto suas subárvores.
+
+        Subárvores de g2 ainda intactas (no primeiro nível, todas: em grafos de
+        SQL, as tabelas com suas colunas e filtros) são componentes
+        independentes, e o peso de um par delas depende só dos dois hashes
+        canônicos: vem de `component_cache`, compartilhado entre comparações.
+        Assim, comparar uma query contra muitas reaproveita os componentes
+        repetidos.
+        """
+        mapping = {}
+        self.used = set()
+        levels2 = self._depth_levels(self.g2)
+
+        for depth, level in enumerate(self._levels):
+            # Elegíveis: nós livres cujo pai também ficou livre (ou raízes)
+            eligible1 = [n for n in level if n not in mapping and
+                         not any(p in mapping for p in self.g1.predecessor_list[n])]
+            if not eligible1:
+                continue
+
+            # Os valores dependem dos nós de g2 já usados: recalcula por nível
+            self._values = {}
+            self._choices = {}
+
+            # Candidatos só na mesma profundidade (em grafos de SQL, tabelas com
+            # tabelas e colunas com colunas): a busca cobre os demais casos
+            groups2 = {}
+            for v2 in levels2[depth] if depth < len(levels2) else ():
+                if v2 not in self.used:
+                    node = self.g2.nodes[v2]
+                    groups2.setdefault((node.node_type, node.label), []).append(v2)
+            groups1 = {}
+            for u1 in eligible1:
+                node = self.g1.nodes[u1]
+                groups1.setdefault((node.node_type, node.label), []).append(u1)
+
+            dirty = self._used_ancestors()
+            def value(u1, v2):
+                return self._pair_value(u1, v2) if v2 in dirty else self._component_value(u1, v2)
+
+            for node_key, group1 in groups1.items():
+                group2 = groups2.get(node_key)
+                if not group2:
+                    continue
+                weights = [[value(u1, v2) for v2 in group2] for u1 in group1]
+                for i, j in _max_weight_assignment(weights):
+                    # Monta os filhos escolhidos só para os pares da atribuição
+                    self._pair_value(group1[i], group2[j])
+                    self._materialize(mapping, group1[i], group2[j])
+        return mapping
+
+    # --------------------------------------------------------------------------
+    # Branch-and-bound
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _depth_levels(graph):
+        """Nós da floresta por profundidade, a partir das raízes, em ordem de id."""
+        levels = []
+        frontier = sorted(n for n in graph.nodes if not graph.predecessor_list[n])
+        while frontier:
+            levels.append(frontier)
+            frontier = sorted(c for n in frontier for c in graph.adjacency_list[n])
+        return levels
+
+    def _prepare(self):
+        """Índices da busca e contadores da relaxação, com todos os nós livres."""
+        g1, g2 = self.g1, self.g2
+        self._labels1, self._labels2 = encode_pair(g1, g2)
+        self._parent1 = {n: next(iter(g1.predecessor_list[n]), None) for n in g1.nodes}
+        self._parent2 = {n: next(iter(g2.predecessor_list[n]), None) for n in g2.nodes}
+
+        self._levels = self._depth_levels(g1)
+        order = [n for level in self._levels for n in level]
+        self._internal = [n for n in order if g1.adjacency_list[n]]
+        self._leaves = [n for n in order if not g1.adjacency_list[n]]
+
+        # Nós de g2 por rótulo e filhos de cada nó por rótulo, em ordem de id
+        self._by_label2 = {}
+        self._children2 = {}
+        for v2 in sorted(g2.nodes):
+            label = self._labels2[v2]
+            self._by_label2.setdefault(label, []).append(v2)
+            parent = self._parent2[v2]
+            if parent is not None:
+                self._children2.setdefault((parent, label), []).append(v2)
+
+        # Contadores da relaxação, por rótulo: nós de g1 não decididos soltos
+        # (`_free`) ou sob o pai casado com P (`_forced[(rótulo, P)]`), nós de
+        # g2 livres (`_unused`) e livres sob P (`_avail[(rótulo, P)]`)
+        labels = len(set(self._labels1.values()) | set(self._labels2.values()))
+        self._free = [0] * labels
+        self._pending = [0] * labels # Nós de g1 ainda não decididos
+        for label in self._labels1.values():
+            self._free[label] += 1
+            self._pending[label] += 1
+        self._unused = [0] * labels
+        for label in self._labels2.values():
+            self._unused[label] += 1
+        self._forced = {}
+        self._avail = {(label, parent): len(children)
+                       for (parent, label), children in self._children2.items()}
+        self._fit = [0] * labels # Soma de min(_forced, _avail) sobre os pais
+        self._term = [min(self._unused[label], self._free[label]) for label in range(labels)]
+        self._bound = sum(self._term)
+
+        self.mapping = {}
+        self.used = set()
+        self._used_below = dict.fromkeys(g2.nodes, 0) # Nós usados em cada subárvore de g2
+
+    def _adjust(self, label, parent=None, free=0, forced=0, avail=0, unused=0):
+        """
+        Atualiza os contadores de um rótulo e o limite `_bound`, que é a soma,
+        por rótulo, de min(nós livres de g2, nós soltos de g1 + Σ_P min(nós de
+        g1 sob o pai casado com P, nós livres de g2 sob P)): o maior casamento
+        possível dos nós não decididos se cada um puder ir para qualquer nó
+        livre de mesma chave (os soltos) ou só para um filho livre de P (os
+        presos ao pai). Com os nós internos todos decididos, só restam folhas,
+        e o limite é exato.
+        """
+        if parent is not None:
+            key = (label, parent)
+            old_forced, old_avail = self._forced.get(key, 0), self._avail.get(key, 0)
+            self._forced[key] = old_forced + forced
+            self._avail[key] = old_avail + avail
+            self._fit[label] += (min(old_forced + forced, old_avail + avail) -
+                                 min(old_forced, old_avail))
+        self._free[label] += free
+        self._unused[label] += unused
+        term = min(self._unused[label], self._free[label] + self._fit[label])
+        self._bound += term - self._term[label]
+        self._term[label] = term
+
+    def _image_of_parent(self, u1):
+        """Nó de g2 casado com o pai de u1 (None se u1 é raiz ou o pai ficou sem par)."""
+        parent = self._parent1[u1]
+        return None if parent is None else self.mapping.get(parent)
+
+    def _decide(self, u1, v2, sign=1):
+        """
+        Tira u1 dos nós não decididos, casando-o com v2 (ou deixando-o sem par,
+        se v2 é None). Com sign=-1, desfaz a decisão.
+        """
+        label = self._labels1[u1]
+        image = self._image_of_parent(u1)
+        if image is None:
+            self._adjust(label, free=-sign)
+        else:
+            self._adjust(label, image, forced=-sign)
+        self._pending[label] -= sign
+        if v2 is None:
+            return
+
+        self._adjust(label, self._parent2[v2], avail=-sign, unused=-sign)
+        # Os filhos de u1 deixam de ser soltos: só podem ir para filhos de v2
+        for child in self.g1.adjacency_list[u1]:
+            child_label = self._labels1[child]
+            self._adjust(child_label, free=-sign)
+            self._adjust(child_label, v2, forced=sign)
+        node = v2
+        while node is not None:
+            self._used_below[node] -= sign
+            node = self._parent2[node]
+        if sign > 0:
+            self.mapping[u1] = v2
+            self.used.add(v2)
+        else:
+            del self.mapping[u1]
+            self.used.discard(v2)
+
+    def _candidates(self, u1):
+        """
+        Opções de u1: os nós livres de g2 que ele pode usar e, por último, None
+        (ficar sem par). Entre candidatos soltos com subárvores idênticas e
+        livres, sob pais que nenhum nó restante pode usar, só vai o primeiro.
+        """
+        label = self._labels1[u1]
+        image = self._image_of_parent(u1)
+        if image is not None:
+            options = [v2 for v2 in self._children2.get((image, label), ()) if v2 not in self.used]
+        else:
+            options = []
+            seen = set()
+            for v2 in self._by_label2.get(label, ()):
+                if v2 in self.used:
+                    continue
+                parent = self._parent2[v2]
+                if not self._used_below[v2] and (
+                        parent is None or (parent not in self.used and
+                                           not self._pending[self._labels2[parent]])):
+                    if self._hashes2[v2] in seen:
+                        continue
+                    seen.add(self._hashes2[v2])
+                options.append(v2)
+        options.append(None)
+        return iter(options)
+
+    def _complete_mapping(self):
+        """Mapeamento com os nós internos decididos e o maior casamento das folhas."""
+        mapping = dict(self.mapping)
+        used = set(self.used)
+        free = {}
+        forced = {}
+        for u1 in self._leaves:
+            label = self._labels1[u1]
+            image = self._image_of_parent(u1)
+            if image is None:
+                free.setdefault(label, []).append(u1)
+            else:
+                forced.setdefault((image, label), []).append(u1)
+        # Primeiro as folhas presas ao pai, que só têm os filhos da imagem dele
+        for (image, label), leaves in forced.items():
+            targets = [v2 for v2 in self._children2.get((image, label), ()) if v2 not in used]
+            for u1, v2 in zip(leaves, targets):
+                mapping[u1] = v2
+                used.add(v2)
+        for label, leaves in free.items():
+            targets = [v2 for v2 in self._by_label2.get(label, ()) if v2 not in used]
+            for u1, v2 in zip(leaves, targets):
+                mapping[u1] = v2
+                used.add(v2)
+        return mapping
+
+    def _budget_exhausted(self):
+        """Conta uma expansão e verifica se o orçamento da busca acabou."""
+        self.expansions += 1
+        if self.max_expansions is not None and self.expansions > self.max_expansions:
+            return True
+        # Consultar o relógio a cada expansão custa caro: verifica a cada 64
+        if self.deadline is not None and not self.expansions & 63:
+            return time.perf_counter() >= self.deadline
+        return False
+
+    def _search(self):
+        """
+        Busca em profundidade sobre uma pilha explícita. Cada quadro é
+        [índice do nó interno, iterador de opções, opção em vigor].
+        """
+        internal = self._internal
+        stack = [[0, self._candidates(internal[0]), False]] if internal else []
+        while stack:
+            frame = stack[-1]
+            index = frame[0]
+            u1 = internal[index]
+            if frame[2] is not False:
+                self._decide(u1, frame[2], sign=-1)
+                frame[2] = False
+            v2 = next(frame[1], False)
+            if v2 is False:
+                stack.pop()
+                continue
+            if self._budget_exhausted():
+                self.interrupted = True
+                return
+
+            self._decide(u1, v2)
+            frame[2] = v2
+            size = len(self.mapping)
+            if size + self._bound <= self.best_size:
+                continue # Nenhuma extensão deste ramo supera o melhor
+            if index + 1 < len(internal):
+                stack.append([index + 1, self._candidates(internal[index + 1]), False])
+                continue
+
+            # Só restam folhas: o limite é o tamanho exato do melhor casamento
+            self.best_size = size + self._bound
+            self.best_mapping = self._complete_mapping()
+            if self.best_size >= self.root_bound:
+                return
+
+    def find_mcs_mapping(self):
+        """
+        Ponto de entrada para a busca pelo MCS. Retorna o mapeamento no mesmo
+        formato do VF2Matcher (nós do primeiro grafo -> nós do segundo).
+        """
+        self._prepare()
+        self.expansions = 0
+        self.interrupted = False
+        self.deadline = None
+        if self.time_budget is not None:
+            self.deadline = time.perf_counter() + self.time_budget
+
+        self.best_mapping = self._greedy_mapping()
+        self.mapping = {}
+        self.used = set()
+        self.best_size = len(self.best_mapping)
+        self.root_bound = self._bound
+        if not self._internal:
+            # Só folhas: o casamento por contagem já é o ótimo
+            self.best_mapping = self._complete_mapping()
+            self.best_size = len(self.best_mapping)
+        elif self.best_size < self.root_bound:
+            self._search()
+
+        self.proven_optimal = not self.interrupted or self.best_size >= self.root_bound
+        self.upper_bound = self.best_size if self.proven_optimal else self.root_bound
+        if self.swapped:
+            return {v: k for k, v in self.best_mapping.items()}
+        return dict(self.best_mapping)
+
+class MCSResult:
+    """
+    Resultado de uma busca de MCS.
+
+    `graph` é o subgrafo comum encontrado (ou None) e `size` o seu número de
+    nós. `upper_bound` limita o tamanho do MCS verdadeiro; quando a busca
+    exata é completa, `proven_optimal` é True e `upper_bound == size`.
+    `interrupted` indica que o orçamento da busca VF2 acabou antes do fim.
+    `mapping` leva cada nó de g1 no MCS ao nó correspondente de g2.
+    """
+    def __init__(self, graph, size, upper_bound, proven_optimal, mapping=None,
+                 interrupted=False):
+        self.graph = graph
+        self.size = size
+        self.upper_bound = upper_bound
+        self.proven_optimal = proven_optimal
+        self.mapping = mapping or {}
+        self.interrupted = interrupted
+
+    def __repr__(self):
+        return (f"MCSResult(size={self.size}, upper_bound={self.upper_bound}, "
+                f"proven_optimal={self.proven_optimal}, interrupted={self.interrupted})")
+
+def find_mcs_result(g1: Graph, g2: Graph, engine='auto', cross_check=False, verbose=True,
+                    time_budget=None, max_expansions=None, stats=None,
+                    workers=1) -> MCSResult:
+    """
+    Encontra o subgrafo máximo comum entre dois grafos, com limite de qualidade.
+
+    Args:
+        g1: O primeiro grafo.
+        g2: O segundo grafo.
+        engine: 'auto' usa o ForestMCSMatcher (exato) quando os dois grafos são
+            florestas, como os de SQL, e o VF2Matcher nos demais; 'forest' e
+            'vf2' forçam um dos motores. O VF2 não é exato para o MCS: depois do
+            primeiro par ele só estende o mapeamento por vizinhos dos nós já
+            casados e pode achar um subgrafo comum menor.
+        cross_check: Se True e o motor de florestas for usado, confere que o
+            mapeamento é um subgrafo comum válido e executa também o VF2Matcher,
+            avisando se ele achar um subgrafo comum maior (o que indicaria um
+            erro no motor exato).
+        verbose: Se False, não imprime mensagens para grafos vazios ou sem MCS
+            (útil em lotes com milhares de pares).
+        time_budget: Tempo máximo da busca, em segundos (None = sem limite).
+        max_expansions: Número máximo de estados expandidos pela busca (no
+            motor de florestas, decisões do branch-and-bound).
+        stats: SearchStats opcional que recebe o tempo da etapa 'mcs', o motor
+            usado e os contadores da busca (do motor de florestas, só os
+            estados expandidos).
+        workers: Processos da busca VF2 (None = número de CPUs; 1 = sequencial).
+            Com mais de um, usa o ParallelVF2Matcher, que chega ao mesmo
+            resultado; com `stats`, a busca instrumentada é sempre sequencial.
+
+    Returns:
+        Um MCSResult; se o orçamento acabar antes do fim da busca, traz o melhor
+        subgrafo encontrado e `interrupted=True`. Uma busca completa do motor de
+        florestas é sempre ótima; a do VF2 só prova otimalidade quando atinge o
+        limite por contagem de rótulos.
+    """
     if not g1.nodes or not g2.nodes:
-        print("Um ou ambos os grafos estão vazios.")
-        return None
+        if verbose:
+            print("Um ou ambos os grafos estão vazios.")
+        return MCSResult(None, 0, 0, True)
 
-    # 1. Instancia nosso matcher local
-    matcher = VF2Matcher(g1, g2)
+    # 1. Escolhe o motor: florestas (todo grafo de SQL) vão para o motor exato
+    if engine == 'auto':
+        engine = 'forest' if is_forest(g1) and is_forest(g2) else 'vf2'
 
     # 2. Encontra o maior mapeamento possível
-    mcs_mapping = matcher.find_mcs_mapping()
+    with stats.stage('mcs') if stats is not None else nullcontext():
+        if engine == 'forest':
+            matcher = ForestMCSMatcher(g1, g2, time_budget=time_budget,
+                                       max_expansions=max_expansions)
+            mcs_mapping = matcher.find_mcs_mapping()
+        elif stats is not None:
+            matcher = InstrumentedVF2Matcher(g1, g2, stats, time_budget=time_budget,
+                                             max_expansions=max_expansions)
+            mcs_mapping = matcher.find_mcs_mapping()
+        elif workers != 1:
+            from parallel_vf2 import ParallelVF2Matcher
+            matcher = ParallelVF2Matcher(g1, g2, workers=workers, time_budget=time_budget,
+                                         max_expansions=max_expansions)
+            mcs_mapping = matcher.find_mcs_mapping()
+        else:
+            matcher = VF2Matcher(g1, g2, time_budget=time_budget, max_expansions=max_expansions)
+            mcs_mapping = matcher.find_mcs_mapping()
+    if stats is not None:
+        stats.engine = engine
+        stats.best_size = len(mcs_mapping)
+        if engine == 'forest':
+            # A busca instrumentada só existe no VF2: aqui, só as decisões
+            stats.states_expanded = matcher.expansions
+
+    if engine == 'forest' and cross_check:
+        if not is_common_subgraph(g1, g2, mcs_mapping):
+            print("Aviso: o mapeamento do motor de florestas não é um subgrafo comum válido.")
+        vf2_mapping = VF2Matcher(g1, g2).find_mcs_mapping()
+        if len(vf2_mapping) > len(mcs_mapping) and not matcher.interrupted:
+            print(f"Aviso: divergência entre motores (floresta={len(mcs_mapping)} nós, "
+                  f"VF2={len(vf2_mapping)} nós).")
 
     if not mcs_mapping:
-        print("Nenhum subgrafo comum encontrado.")
-        return None
-    
+        if verbose:
+            print("Nenhum subgrafo comum encontrado.")
+        return MCSResult(None, 0, matcher.upper_bound, matcher.proven_optimal,
+                         interrupted=matcher.interrupted)
+
     # 3. Usa o mapeamento para construir o subgrafo
-    # As chaves do mapeamento são os nós do grafo que foi usado como base (g1 no matcher)
-    if matcher.swapped:
-        mcs_nodes_ids = list(mcs_mapping.keys())
-        mcs_custom_graph = g2.subgraph(mcs_nodes_ids)
-    else:
-        mcs_nodes_ids = list(mcs_mapping.keys())
-        mcs_custom_graph = g1.subgraph(mcs_nodes_ids)
-    
-    # 4. Converte para networkx apenas para visualização
-    return mcs_custom_graph
+    # Os mapeamentos são sempre devolvidos com as chaves em g1 (já desfeita a troca)
+    mcs_nodes_ids = list(mcs_mapping.keys())
+    mcs_custom_graph = g1.subgraph(mcs_nodes_ids)
+
+    return MCSResult(mcs_custom_graph, len(mcs_mapping), matcher.upper_bound,
+                     matcher.proven_optimal, mcs_mapping, interrupted=matcher.interrupted)
+
+def find_maximum_common_subgraph(g1: Graph, g2: Graph, engine='auto', cross_check=False,
+                                  verbose=True, time_budget=None, max_expansions=None,
+                                  stats=None, workers=1):
+    """
+    Encontra o subgrafo máximo comum entre dois grafos.
+
+    Aceita os mesmos argumentos de `find_mcs_result`.
+
+    Returns:
+        O grafo MCS (subgrafo de g1) ou None.
+    """
+    return find_mcs_result(g1, g2, engine=engine, cross_check=cross_check, verbose=verbose,
+                           time_budget=time_budget, max_expansions=max_expansions,
+                           stats=stats, workers=workers).graph
 
 def calculate_similarity_percentage(g1: Graph, g2: Graph, mcs_graph):
     """
@@ -58,4 +741,17 @@ def calculate_similarity_percentage(g1: Graph, g2: Graph, mcs_graph):
         return 0.0
 
     similarity = (size_mcs / denominator) * 100
-    return similarity
\ No newline at end of file
+    return similarity
+
+def calculate_similarity_interval(g1: Graph, g2: Graph, result: MCSResult):
+    """
+    Intervalo (mínimo, máximo) da similaridade percentual para um MCSResult.
+
+    O mínimo vem do subgrafo encontrado e o máximo do limite superior do MCS;
+    para resultados ótimos os dois coincidem.
+    """
+    denominator = min(len(g1.nodes), len(g2.nodes))
+    if denominator == 0:
+        return 0.0, 0.0
+    return (result.size / denominator * 100,
+            min(result.upper_bound, denominator) / denominator * 100)
@@ -0,0 +1,198 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.sharedctypes import RawArray
+
+from vf2 import VF2Matcher
+
+# Estado do processo trabalhador, recebido uma única vez pelo initializer do pool
+_worker = None
+
+def _init_worker(g1, g2, best_sizes, seed, options):
+    global _worker
+    _worker = (g1, g2, best_sizes, seed, options)
+
+def _solve_block(block, deadline):
+    """
+    Unidade de trabalho do pool: resolve, em ordem, um bloco de subproblemas
+    consecutivos [(índice, par da raiz)] com um mesmo `SubproblemMatcher`.
+
+    Returns:
+        Lista de (índice, mapeamento, interrompido).
+    """
+    g1, g2, best_sizes, seed, options = _worker
+    matcher = SubproblemMatcher(g1, g2, best_sizes, deadline=deadline, **options)
+    return [(index, matcher.solve(index, pair, seed), matcher.interrupted)
+            for index, pair in block]
+
+class SubproblemMatcher(VF2Matcher):
+    """
+    VF2Matcher restrito às subárvores de busca de pares da raiz (os
+    subproblemas), podando contra os melhores tamanhos de todos eles.
+
+    `best_sizes[i]` é o tamanho do melhor mapeamento já encontrado pelo
+    subproblema i, escrito só por quem o resolve e lido pelos demais. Para que
+    o resultado seja o mesmo da busca sequencial, que percorre os subproblemas
+    em ordem e fica com o primeiro mapeamento de tamanho máximo, um ramo é
+    cortado se não pode superar o melhor de um subproblema anterior (ou o do
+    atual) ou se não pode sequer empatar com o de um posterior.
+
+    Subproblemas resolvidos pela mesma instância, em ordem crescente,
+    compartilham o conjunto de estados visitados, como na busca sequencial.
+    """
+    # Intervalo, em estados, entre leituras dos tamanhos compartilhados
+    REFRESH_INTERVAL = 64
+
+    def __init__(self, g1, g2, best_sizes, deadline=None, **kwargs):
+        # O orçamento de tempo vem de um prazo comum a todos os processos
+        super().__init__(g1, g2, time_budget=None if deadline is None else 0.0, **kwargs)
+        self.best_sizes = best_sizes
+        self.deadline_at = deadline # Em time.time(), comparável entre processos
+        self.index = 0
+        self._states = 0
+        self._reset_state()
+
+    def _refresh_bounds(self):
+        sizes = self.best_sizes[:]
+        self._earlier_best = max(sizes[:self.index + 1])
+        self._later_best = max(sizes[self.index + 1:], default=0)
+
+    def _enter_state(self):
+        if len(self.mapping) > len(self.best_mapping):
+            self.best_mapping = self.mapping.copy()
+            self.best_sizes[self.index] = len(self.best_mapping)
+
+        if self.prune:
+            self._states += 1
+            if not self._states % self.REFRESH_INTERVAL:
+                self._refresh_bounds()
+            best = max(len(self.best_mapping), self._earlier_best)
+            if best >= self.max_size:
+                self.finished = True
+                return False
+            bound = self._upper_bound()
+            if bound <= best or bound < self._later_best:
+                return False
+        return True
+
+    def solve(self, index, pair, seed=None):
+        """
+        Busca o melhor mapeamento entre os que começam pelo par `pair` da raiz
+        (orientado como os grafos internos, após a eventual troca).
+        """
+        if self._stack:
+            # Um subproblema anterior foi interrompido no meio: recomeça do
+            # estado vazio, mas mantém os estados já visitados
+            visited = self._visited
+            self._reset_state()
+            self._visited = visited
+        self.index = index
+        self.finished = False
+        self.best_mapping = dict(seed or {})
+        self._refresh_bounds()
+
+        if self.deadline_at is not None:
+            self.time_budget = self.deadline_at - time.time()
+            if self.time_budget <= 0:
+                self.interrupted = True
+                return self.best_mapping
+
+        if self._is_consistent(*pair):
+            self._add_pair(*pair)
+            self._is_new_state()
+            if self._enter_state():
+                self._stack.append([self._compute_candidate_pairs(), pair, 0])
+            else:
+                self._remove_pair(*pair)
+        self._run()
+        return self.best_mapping
+
+class ParallelVF2Matcher:
+    """
+    Busca VF2 de um único par de grafos distribuída entre processos.
+
+    A árvore de busca é dividida na raiz: cada par candidato inicial (como
+    gerado por `_compute_candidate_pairs`) é um subproblema independente,
+    resolvido por um `SubproblemMatcher` no pool. Os tamanhos dos melhores
+    mapeamentos ficam em memória compartilhada, então cada processo poda contra
+    o melhor global. O tamanho do resultado (e, na busca sem orçamento, o
+    próprio mapeamento) é o mesmo do VF2Matcher sequencial.
+
+    Expõe a mesma interface do VF2Matcher (`swapped`, `find_mcs_mapping`,
+    `upper_bound`, `interrupted`, `proven_optimal`). `time_budget` vale para a busca toda;
+    `max_expansions`, para cada subproblema.
+    """
+    # Blocos de subproblemas por processo: mais blocos equilibram melhor a
+    # carga, menos blocos repetem menos estados já visitados em outro bloco
+    BLOCKS_PER_WORKER = 4
+
+    def __init__(self, g1: 'Graph', g2: 'Graph', workers=None, time_budget=None,
+                 max_expansions=None, symmetry=True, max_visited=100000):
+        self.root = VF2Matcher(g1, g2, time_budget=time_budget, max_expansions=max_expansions,
+                               symmetry=symmetry, max_visited=max_visited)
+        self.swapped = self.root.swapped
+        self.workers = workers
+        self.time_budget = time_budget
+        self.options = {'max_expansions': max_expansions, 'symmetry': symmetry,
+                        'max_visited': max_visited}
+        self.subproblems = 0
+        self.interrupted = False
+        self.proven_optimal = False
+        self.upper_bound = None
+
+    def _blocks(self, pairs, workers):
+        """Divide os subproblemas em blocos consecutivos, alguns por processo."""
+        size = max(1, -(-len(pairs) // (workers * self.BLOCKS_PER_WORKER)))
+        indexed = list(enumerate(pairs))
+        return [indexed[start:start + size] for start in range(0, len(indexed), size)]
+
+    def _solve_all(self, pairs, seed):
+        """Resolve os subproblemas e devolve {índice: (mapeamento, interrompido)}."""
+        deadline = None if self.time_budget is None else time.time() + self.time_budget
+        g1, g2 = self.root.g1, self.root.g2
+        workers = self.workers or os.cpu_count() or 1
+        if workers == 1:
+            # Sem pool: um único bloco, no próprio processo
+            _init_worker(g1, g2, [len(seed)] * len(pairs), seed, self.options)
+            results = _solve_block(list(enumerate(pairs)), deadline)
+        else:
+            best_sizes = RawArray('i', [len(seed)] * len(pairs))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(g1, g2, best_sizes, seed, self.options)) as executor:
+                # Submetidos em ordem: os primeiros subproblemas, que desempatam,
+                # começam antes
+                futures = [executor.submit(_solve_block, block, deadline)
+                           for block in self._blocks(pairs, workers)]
+                results = [result for future in futures for result in future.result()]
+        return {index: (mapping, interrupted) for index, mapping, interrupted in results}
+
+    def find_mcs_mapping(self):
+        """Ponto de entrada da busca paralela pelo MCS."""
+        root = self.root
+        root._reset_state()
+        seed = root._greedy_mapping()
+        best = seed
+        self.interrupted = False
+
+        # Mesmas condições de parada da raiz na busca sequencial
+        pairs = []
+        if len(seed) < root.max_size and root._upper_bound() > len(seed):
+            pairs = list(root._compute_candidate_pairs())
+        self.subproblems = len(pairs)
+
+        if pairs:
+            results = self._solve_all(pairs, seed)
+            # Empates ficam com o subproblema de menor índice, como na busca
+            # sequencial (que só troca o melhor por um estritamente maior)
+            for index in range(len(pairs)):
+                mapping, interrupted = results[index]
+                self.interrupted = self.interrupted or interrupted
+                if len(mapping) > len(best):
+                    best = mapping
+
+        # Como na busca sequencial, só o limite global por rótulos prova otimalidade
+        self.proven_optimal = len(best) >= root.max_size
+        self.upper_bound = len(best) if self.proven_optimal else root.max_size
+        if self.swapped:
+            return {v: k for k, v in best.items()}
+        return dict(best)
@@ -0,0 +1,172 @@
+import heapq
+
+from graph_cache import GraphCache
+from graph_signatures import label_histogram, wl_subtree_hashes, mcs_size_upper_bound
+from graph_structures import CompactGraph
+from label_encoding import LabelMatrix, numpy_available
+from mcs_finder import find_maximum_common_subgraph, calculate_similarity_percentage
+
+def _similarity(graph, other):
+    """Similaridade exata (pelo MCS) entre a query e o grafo de uma entrada."""
+    mcs = find_maximum_common_subgraph(graph, other, verbose=False)
+    return calculate_similarity_percentage(graph, other, mcs) if mcs else 0.0
+
+class IndexEntry:
+    """Grafo armazenado no índice, com suas assinaturas."""
+    def __init__(self, key, sql, graph, wl_iterations):
+        self.key = key
+        self.sql = sql
+        self.graph = graph
+        self.size = len(graph.nodes)
+        self.histogram = label_histogram(graph)
+        self.wl_hashes = wl_subtree_hashes(graph, wl_iterations)
+
+class QueryIndex:
+    """
+    Índice de queries para busca das k mais similares a uma nova query.
+
+    Cada grafo é guardado com assinaturas baratas: o histograma de (tipo,
+    rótulo), que dá um limite superior para `calculate_similarity_percentage`,
+    e os rótulos Weisfeiler-Lehman, usados para ordenar candidatos de mesmo
+    limite pela semelhança estrutural. A busca avalia os candidatos em ordem
+    decrescente de limite e só executa o MCS exato enquanto algum limite
+    restante ainda puder entrar no top-k.
+    """
+    def __init__(self, cache=None, wl_iterations=2, compact=False):
+        self.cache = cache or GraphCache()
+        self.wl_iterations = wl_iterations
+        # Guarda os grafos como CompactGraph (bem menos memória em corpora grandes)
+        self.compact = compact
+        self.entries = []
+        # Sobreposição de rótulos em lote: com numpy, uma matriz esparsa de
+        # histogramas avaliada de uma vez; sem ele, um índice invertido
+        # chave (tipo, rótulo) -> [(id da entrada, contagem)]
+        self._labels = LabelMatrix() if numpy_available() else None
+        self._postings = {}
+        # Quantidade de MCS exatos executados na última busca
+        self.exact_evaluations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, sql: str, key=None):
+        """
+        Adiciona uma query ao índice. Retorna o id da entrada, ou None se a
+        query for inválida ou vazia.
+        """
+        graph = self.cache.get_graph(sql)
+        if not graph:
+            return None
+        return self.add_graph(graph, key=key, sql=sql)
+
+    def add_graph(self, graph, key=None, sql=None) -> int:
+        """
+        Adiciona um grafo já construído ao índice e retorna o id da entrada, ou
+        None se o grafo não tiver nós (a similaridade com ele não é definida).
+        """
+        if not graph.nodes:
+            return None
+        entry_id = len(self.entries)
+        if self.compact and not isinstance(graph, CompactGraph):
+            graph = CompactGraph.from_graph(graph)
+        entry = IndexEntry(entry_id if key is None else key, sql, graph, self.wl_iterations)
+        self.entries.append(entry)
+        if self._labels is not None:
+            self._labels.add(entry.histogram)
+        else:
+            for label_key, count in entry.histogram.items():
+                self._postings.setdefault(label_key, []).append((entry_id, count))
+        return entry_id
+
+    def add_corpus(self, corpus) -> int:
+        """
+        Adiciona todos os grafos de um GraphCorpus, sem parsing: cada entrada
+        guarda o CompactGraph mapeado do arquivo, com o id do grafo no corpus
+        como chave. Grafos vazios são ignorados. Retorna a quantidade de
+        entradas adicionadas.
+        """
+        added = 0
+        for graph_id, graph in enumerate(corpus):
+            if self.add_graph(graph, key=graph_id, sql=corpus.sql(graph_id)) is not None:
+                added += 1
+        return added
+
+    def _candidates(self, histogram, size, wl_hashes):
+        """
+        Calcula o limite superior de similaridade das entradas com algum rótulo
+        em comum, em ordem decrescente de limite (e de sobreposição WL nos
+        empates).
+        """
+        if not size:
+            return []
+        if self._labels is not None:
+            overlap = {entry_id: shared
+                       for entry_id, shared in enumerate(self._labels.overlaps(histogram)) if shared}
+        else:
+            overlap = {}
+            for label_key, count in histogram.items():
+                for entry_id, entry_count in self._postings.get(label_key, ()):
+                    overlap[entry_id] = overlap.get(entry_id, 0) + min(count, entry_count)
+
+        candidates = []
+        for entry_id, shared in overlap.items():
+            entry = self.entries[entry_id]
+            bound = shared / min(size, entry.size) * 100
+            wl_overlap = mcs_size_upper_bound(wl_hashes, entry.wl_hashes)
+            candidates.append((-bound, -wl_overlap, entry_id))
+        candidates.sort()
+        return [(-bound, entry_id) for bound, _, entry_id in candidates]
+
+    def search(self, sql: str, k=5):
+        """
+        Retorna as k queries armazenadas mais similares a `sql`, como lista de
+        (similaridade, chave, sql) em ordem decrescente de similaridade.
+        """
+        graph = self.cache.get_graph(sql)
+        if not graph or not graph.nodes:
+            return []
+        return self.search_graph(graph, k)
+
+    def search_graph(self, graph, k=5):
+        """Versão de `search` para um grafo já construído."""
+        steps = self.search_steps(graph, k)
+        try:
+            pair = next(steps)
+            while True:
+                pair = steps.send(_similarity(*pair))
+        except StopIteration as stop:
+            return stop.value
+
+    def search_steps(self, graph, k=5):
+        """
+        `search_graph` como gerador, para quem calcula o MCS em outro lugar (ex:
+        no pool de processos do serviço): produz cada par (grafo da query,
+        grafo da entrada) a comparar e recebe de volta, via `send`, a
+        similaridade. O resultado da busca é o valor de retorno do gerador.
+        """
+        self.exact_evaluations = 0
+        if k <= 0 or not graph.nodes:
+            return []
+
+        histogram = label_histogram(graph)
+        wl_hashes = wl_subtree_hashes(graph, self.wl_iterations)
+
+        # Heap mínimo com os k melhores: (similaridade, -id da entrada)
+        best = []
+        for bound, entry_id in self._candidates(histogram, len(graph.nodes), wl_hashes):
+            if len(best) == k and bound <= best[0][0]:
+                break # Nenhum candidato restante pode entrar no top-k
+
+            entry = self.entries[entry_id]
+            self.exact_evaluations += 1
+            similarity = yield graph, entry.graph
+
+            item = (similarity, -entry_id)
+            if len(best) < k:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+
+        results = sorted(best, reverse=True)
+        return [(similarity, self.entries[-neg_id].key, self.entries[-neg_id].sql)
+                for similarity, neg_id in results]
@@ -0,0 +1,132 @@
+import json
+import os
+
+from sqlglot.errors import TokenError
+from sqlglot.tokens import Tokenizer, TokenType
+
+from mcs_finder import calculate_similarity_percentage
+
+class _StatementTokenizer(Tokenizer):
+    """
+    Tokenizador padrão do sqlglot com dollar quoting ($$ ... $$, $tag$ ... $tag$),
+    como no PostgreSQL: o corpo de uma função vira um único token, mesmo com ';'.
+    """
+    SINGLE_TOKENS = {**Tokenizer.SINGLE_TOKENS, '$': TokenType.HEREDOC_STRING}
+    VAR_SINGLE_TOKENS = {'$'}
+    HEREDOC_STRINGS = ['$']
+    HEREDOC_TAG_IS_IDENTIFIER = True
+    # '$' sem tag fechada é um parâmetro posicional ($1)
+    HEREDOC_STRING_ALTERNATIVE = TokenType.PARAMETER
+
+def iter_sql_statements(lines):
+    """
+    Divide um fluxo de linhas SQL em instruções, uma de cada vez.
+
+    As fronteiras são os tokens ';' do tokenizador do sqlglot, então um ';'
+    dentro de literais (inclusive blocos $tag$ ... $tag$) ou comentários não
+    separa instruções. Só a instrução em andamento fica em memória.
+
+    Args:
+        lines: Iterável de linhas de texto (ex: um arquivo aberto).
+
+    Yields:
+        Cada instrução, sem o ';' final e sem espaços nas bordas.
+    """
+    tokenizer = _StatementTokenizer()
+    buffer = ''
+    for line in lines:
+        buffer += line
+        if ';' not in line:
+            continue
+        try:
+            tokens = tokenizer.tokenize(buffer)
+        except TokenError:
+            # Literal ou comentário ainda aberto: espera pelas próximas linhas
+            continue
+
+        start = 0
+        for token in tokens:
+            if token.token_type == TokenType.SEMICOLON:
+                statement = buffer[start:token.start].strip()
+                if statement:
+                    yield statement
+                start = token.end + 1
+        buffer = buffer[start:]
+
+    statement = buffer.strip()
+    if statement:
+        yield statement
+
+def iter_jsonl_queries(lines):
+    """
+    Lê queries de linhas JSON: cada linha é uma string JSON ou um objeto com o
+    campo "sql" (ou "query"). Linhas em branco ou inválidas são ignoradas.
+    """
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Aviso: linha {number} ignorada (JSON inválido: {e}).")
+            continue
+        if isinstance(record, dict):
+            record = record.get('sql', record.get('query'))
+        if isinstance(record, str) and record.strip():
+            yield record.strip()
+
+def iter_line_queries(lines):
+    """Lê uma query por linha, ignorando linhas em branco e um ';' final."""
+    for line in lines:
+        query = line.strip().rstrip(';').strip()
+        if query:
+            yield query
+
+QUERY_FORMATS = {
+    'sql': iter_sql_statements,
+    'jsonl': iter_jsonl_queries,
+    'lines': iter_line_queries,
+}
+
+def detect_format(filepath: str) -> str:
+    """Infere o formato pela extensão: .jsonl/.ndjson -> 'jsonl', demais -> 'sql'."""
+    extension = os.path.splitext(filepath)[1].lower()
+    return 'jsonl' if extension in ('.jsonl', '.ndjson') else 'sql'
+
+def iter_queries(filepath: str, fmt='auto'):
+    """
+    Lê as queries de um arquivo de log sob demanda, sem carregá-lo inteiro.
+
+    Args:
+        filepath: Caminho do arquivo.
+        fmt: 'sql' (separadas por ';'), 'jsonl', 'lines' (uma por linha) ou
+            'auto' para inferir pela extensão.
+    """
+    if fmt == 'auto':
+        fmt = detect_format(filepath)
+    with open(filepath, 'r', encoding='utf-8') as f:
+        yield from QUERY_FORMATS[fmt](f)
+
+def iter_pairs(items):
+    """Agrupa um fluxo em pares consecutivos: (1º, 2º), (3º, 4º), ..."""
+    iterator = iter(items)
+    for first in iterator:
+        second = next(iterator, None)
+        if second is None:
+            print("Aviso: número ímpar de queries; a última foi ignorada.")
+            return
+        yield first, second
+
+def iter_comparisons(pairs, cache):
+    """
+    Etapa de comparação: para cada par de queries, produz
+    (sql_a, sql_b, similaridade, nós no MCS). O MCS vem do GraphCache, que
+    reaproveita resultados de pares de impressões digitais já vistos.
+    """
+    for sql_a, sql_b in pairs:
+        graph_a, graph_b, mcs = cache.get_mcs(sql_a, sql_b)
+        if mcs is None:
+            yield sql_a, sql_b, 0.0, 0
+        else:
+            yield sql_a, sql_b, calculate_similarity_percentage(graph_a, graph_b, mcs), len(mcs)
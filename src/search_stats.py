@@ -0,0 +1,56 @@
+import time
+from contextlib import contextmanager
+
+class SearchStats:
+    """
+    Estatísticas de uma comparação: tempo de cada etapa (parsing, construção
+    do grafo, MCS) e contadores da busca.
+
+    Só é preenchido quando passado explicitamente (ex: `find_mcs_result(...,
+    stats=SearchStats())`); sem ele, nenhum contador ou relógio é consultado.
+    """
+    def __init__(self):
+        self.stages = {}            # Etapa -> segundos acumulados
+        self.engine = None          # Motor usado no MCS ('forest' ou 'vf2')
+        self.states_expanded = 0    # Estados visitados (no motor de florestas, decisões)
+        self.consistency_checks = 0 # Pares candidatos testados
+        self.pruned_pairs = 0       # Pares rejeitados pelo teste de consistência
+        self.bound_prunes = 0       # Estados cortados pelo limite superior
+        self.symmetry_prunes = 0    # Estados repetidos (mesmos pares em outra ordem)
+        self.max_depth = 0          # Maior mapeamento parcial explorado
+        self.best_size = 0          # Tamanho do melhor mapeamento
+        self.time_to_best = 0.0     # Segundos até encontrar o melhor mapeamento
+        self.search_seconds = 0.0   # Duração total da busca
+
+    @contextmanager
+    def stage(self, name):
+        """Cronometra o bloco e soma o tempo à etapa `name`."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def to_dict(self) -> dict:
+        """Representação serializável em JSON."""
+        return {
+            'stages': dict(self.stages),
+            'engine': self.engine,
+            'states_expanded': self.states_expanded,
+            'consistency_checks': self.consistency_checks,
+            'pruned_pairs': self.pruned_pairs,
+            'bound_prunes': self.bound_prunes,
+            'symmetry_prunes': self.symmetry_prunes,
+            'max_depth': self.max_depth,
+            'best_size': self.best_size,
+            'time_to_best': self.time_to_best,
+            'search_seconds': self.search_seconds,
+        }
+
+    def __repr__(self):
+        stages = ', '.join(f"{name}={seconds * 1000:.2f}ms" for name, seconds in self.stages.items())
+        return (f"SearchStats({stages}; engine={self.engine}, states={self.states_expanded}, "
+                f"checks={self.consistency_checks}, pruned={self.pruned_pairs}, "
+                f"bound_prunes={self.bound_prunes}, symmetry_prunes={self.symmetry_prunes}, "
+                f"max_depth={self.max_depth}, "
+                f"time_to_best={self.time_to_best * 1000:.2f}ms)")
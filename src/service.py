@@ -0,0 +1,308 @@
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from graph_cache import GraphCache
+from lru_cache import LRUCache
+from mcs_finder import find_maximum_common_subgraph, calculate_similarity_percentage
+from query_index import QueryIndex
+from wl_similarity import WLScorer
+
+def _compare_graphs(graph_a, graph_b):
+    """Unidade de trabalho do pool: (similaridade, nós no MCS) entre dois grafos."""
+    mcs = find_maximum_common_subgraph(graph_a, graph_b, verbose=False)
+    if not mcs:
+        return 0.0, 0
+    return calculate_similarity_percentage(graph_a, graph_b, mcs), len(mcs.nodes)
+
+def _pool_context():
+    """
+    Contexto dos processos do pool. Com 'fork', os trabalhadores (criados sob
+    demanda) herdariam as conexões abertas no socket, que nunca fechariam para o
+    cliente; o 'forkserver' cria processos a partir de um servidor limpo.
+    """
+    try:
+        context = multiprocessing.get_context('forkserver')
+    except ValueError:
+        return None
+    # O servidor importa o motor uma vez; cada trabalhador já nasce com ele carregado
+    context.set_forkserver_preload(['mcs_finder'])
+    return context
+
+class ComparisonService:
+    """
+    Serviço de comparação de longa duração.
+
+    Recebe requisições JSON (dicionários) e mantém aquecidos, entre elas, os
+    grafos (GraphCache), os resultados por par de impressões digitais e os
+    corpora indexados para busca. Os MCS de pares novos rodam em um pool de
+    processos, então várias requisições são atendidas ao mesmo tempo.
+
+    Requisições:
+        {"a": SQL, "b": SQL}                     compara duas queries
+        {"a": SQL, "b": SQL, "approximate": true}  idem, pelo kernel WL (sem MCS)
+        {"sql": SQL, "corpus": ID, "k": 5}       top-k do corpus mais similares
+        {"op": "add", "corpus": ID, "sql": SQL}  adiciona uma query a um corpus
+        {"op": "stats"}                          contadores, caches e latências
+    Um campo "id" opcional é devolvido na resposta, que sempre traz
+    "latency_ms" (ou "error", se a requisição for inválida).
+    """
+    def __init__(self, workers=None, cache=None, result_maxsize=4096):
+        self.cache = cache or GraphCache()
+        self.results = LRUCache(result_maxsize)
+        self.approximate = WLScorer(cache=self.cache)
+        self.corpora = {}
+        self.workers = workers
+        self.requests = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=1000) # Latências recentes, em segundos
+        self._pending = {} # Par de impressões digitais -> future em andamento
+        # workers=1 calcula no próprio processo, sem pool (como em similarity_matrix)
+        self._executor = None
+        if workers != 1:
+            self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+
+    def warm_up(self):
+        """Inicia o pool antes da primeira requisição, para não pesar na sua latência."""
+        if self._executor is not None:
+            self._executor.submit(int).result()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def corpus(self, corpus_id) -> QueryIndex:
+        """Índice do corpus, criado vazio na primeira vez."""
+        index = self.corpora.get(corpus_id)
+        if index is None:
+            index = self.corpora[corpus_id] = QueryIndex(cache=self.cache)
+        return index
+
+    async def handle(self, request) -> dict:
+        """Atende uma requisição e devolve a resposta, com a latência medida."""
+        start = time.perf_counter()
+        self.requests += 1
+        response = {}
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("a requisição deve ser um objeto JSON")
+            if 'id' in request:
+                response['id'] = request['id']
+            response.update(await self._dispatch(request))
+        except KeyError as e:
+            self.errors += 1
+            response['error'] = f"campo obrigatório ausente: {e}"
+        except Exception as e:
+            # Uma requisição com problema nunca derruba o serviço
+            self.errors += 1
+            response['error'] = str(e)
+        elapsed = time.perf_counter() - start
+        self.latencies.append(elapsed)
+        response['latency_ms'] = round(elapsed * 1000, 3)
+        return response
+
+    async def _dispatch(self, request):
+        op = request.get('op')
+        if op is None:
+            op = 'compare' if 'a' in request and 'b' in request else 'search'
+
+        if op == 'compare':
+            if request.get('approximate'):
+                return self.compare_approximate(request['a'], request['b'])
+            return await self.compare(request['a'], request['b'])
+        if op == 'search':
+            return await self.search(request['sql'], request['corpus'], int(request.get('k', 5)))
+        if op == 'add':
+            entry_id = self.corpus(request['corpus']).add(request['sql'], key=request.get('key'))
+            if entry_id is None:
+                raise ValueError("query inválida ou vazia")
+            return {'corpus': request['corpus'], 'size': len(self.corpora[request['corpus']])}
+        if op == 'stats':
+            return self.stats()
+        raise ValueError(f"operação desconhecida: {op!r}")
+
+    async def compare(self, sql_a: str, sql_b: str) -> dict:
+        """Similaridade entre duas queries, reaproveitando grafos e resultados em cache."""
+        fingerprint_a, fingerprint_b = self.cache.fingerprint(sql_a), self.cache.fingerprint(sql_b)
+        if fingerprint_a is None or fingerprint_b is None:
+            raise ValueError("falha no parsing da query")
+
+        key = (fingerprint_a, fingerprint_b)
+        result = self.results.get(key)
+        cached = result is not None
+        if not cached:
+            future = self._pending.get(key)
+            if future is None:
+                # Pares idênticos que chegam juntos compartilham o mesmo cálculo
+                future = asyncio.ensure_future(self._run_compare(sql_a, sql_b))
+                self._pending[key] = future
+                future.add_done_callback(lambda _: self._pending.pop(key, None))
+            result = await future
+            self.results.put(key, result)
+
+        similarity, mcs_size = result
+        return {'similarity': similarity, 'mcs_nodes': mcs_size, 'cached': cached}
+
+    def compare_approximate(self, sql_a: str, sql_b: str) -> dict:
+        """Similaridade aproximada (WLScorer), calculada no próprio processo."""
+        if self.approximate.features(sql_a) is None or self.approximate.features(sql_b) is None:
+            raise ValueError("falha no parsing da query")
+        return {'similarity': self.approximate.similarity(sql_a, sql_b), 'approximate': True}
+
+    async def _run_compare(self, sql_a, sql_b):
+        return await self._run_graphs(self.cache.get_graph(sql_a), self.cache.get_graph(sql_b))
+
+    async def _run_graphs(self, graph_a, graph_b):
+        if self._executor is None:
+            return _compare_graphs(graph_a, graph_b)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _compare_graphs, graph_a, graph_b)
+
+    async def search(self, sql: str, corpus_id, k=5) -> dict:
+        """
+        Top-k do corpus. A filtragem por assinaturas roda no processo do
+        serviço, onde o índice está aquecido; cada MCS exato vai para o pool,
+        sem bloquear o laço de eventos.
+        """
+        if corpus_id not in self.corpora:
+            raise ValueError(f"corpus desconhecido: {corpus_id!r}")
+        results = []
+        graph = self.cache.get_graph(sql)
+        if graph and graph.nodes:
+            steps = self.corpora[corpus_id].search_steps(graph, k=k)
+            try:
+                pair = next(steps)
+                while True:
+                    similarity, _ = await self._run_graphs(*pair)
+                    pair = steps.send(similarity)
+            except StopIteration as stop:
+                results = stop.value
+        return {'corpus': corpus_id,
+                'results': [{'similarity': similarity, 'key': key, 'sql': text}
+                            for similarity, key, text in results]}
+
+    def stats(self) -> dict:
+        """Contadores de requisições, latências recentes (ms) e estado dos caches."""
+        latencies = sorted(self.latencies)
+        summary = {}
+        if latencies:
+            summary = {'mean': sum(latencies) / len(latencies) * 1000,
+                       'p50': latencies[len(latencies) // 2] * 1000,
+                       'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+                       'max': latencies[-1] * 1000}
+        return {'requests': self.requests, 'errors': self.errors, 'latency_ms': summary,
+                'corpora': {name: len(index) for name, index in self.corpora.items()},
+                'cache': self.cache.stats(), 'results': self.results.stats(),
+                'wl_vectors': self.approximate.vectors.stats()}
+
+async def _answer(service, line, write):
+    """Decodifica uma linha JSONL, atende e escreve a resposta."""
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as e:
+        service.errors += 1
+        write({'error': f"JSON inválido: {e}"})
+        return
+    write(await service.handle(request))
+
+async def serve_stdin(service: ComparisonService, max_pending=64):
+    """
+    Lê requisições JSONL da entrada padrão e escreve as respostas, uma por
+    linha, na saída padrão, na ordem em que ficam prontas (use "id" para
+    associá-las). Termina no fim da entrada, após atender tudo o que chegou.
+    """
+    loop = asyncio.get_running_loop()
+    output = sys.stdout
+    slots = asyncio.Semaphore(max_pending)
+    tasks = set()
+
+    def write(response):
+        output.write(json.dumps(response) + '\n')
+        output.flush()
+
+    def finished(task):
+        tasks.discard(task)
+        slots.release()
+
+    # Mensagens de diagnóstico (ex: erros de parsing) vão para stderr, para não
+    # misturar com as respostas
+    with contextlib.redirect_stdout(sys.stderr):
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            if not line.strip():
+                continue
+            # Com max_pending requisições em andamento, para de ler até uma terminar
+            await slots.acquire()
+            task = asyncio.ensure_future(_answer(service, line, write))
+            tasks.add(task)
+            task.add_done_callback(finished)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+async def serve_unix(service: ComparisonService, path: str):
+    """
+    Atende requisições JSONL em um socket Unix local. Cada conexão pode enviar
+    várias requisições; as respostas voltam pela mesma conexão.
+    """
+    async def handle_connection(reader, writer):
+        tasks = set()
+
+        def write(response):
+            writer.write((json.dumps(response) + '\n').encode('utf-8'))
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.ensure_future(_answer(service, line, write))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        await writer.drain()
+        writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(handle_connection, path=path)
+    print(f"Servindo em {path}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+def run_service(corpus_queries=(), socket_path=None, workers=None, corpus_path=None):
+    """
+    Inicia o serviço na entrada padrão ou, com `socket_path`, em um socket Unix.
+    As queries de `corpus_queries` são pré-carregadas no corpus "default", depois
+    dos grafos do GraphCorpus em `corpus_path` (carregados sem parsing).
+    """
+    service = ComparisonService(workers=workers)
+    service.warm_up()
+    try:
+        default = service.corpus('default')
+        if corpus_path:
+            from graph_corpus import GraphCorpus
+            default.add_corpus(GraphCorpus(corpus_path, create=False))
+        with contextlib.redirect_stdout(sys.stderr):
+            for sql in corpus_queries:
+                default.add(sql)
+        if socket_path:
+            asyncio.run(serve_unix(service, socket_path))
+        else:
+            asyncio.run(serve_stdin(service))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
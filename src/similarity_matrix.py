@@ -0,0 +1,129 @@
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from graph_cache import GraphCache
+from mcs_finder import find_maximum_common_subgraph, calculate_similarity_percentage
+
+# Grafos do processo trabalhador, recebidos uma única vez pelo initializer do pool
+_worker_graphs = None
+
+def _init_worker(graphs):
+    global _worker_graphs
+    _worker_graphs = graphs
+
+def _pair_similarity(graphs, i, j):
+    """Similaridade percentual entre os grafos i e j (0.0 se algum for inválido)."""
+    g1, g2 = graphs[i], graphs[j]
+    if not g1 or not g2:
+        return 0.0
+    mcs = find_maximum_common_subgraph(g1, g2, verbose=False)
+    if not mcs:
+        return 0.0
+    return calculate_similarity_percentage(g1, g2, mcs)
+
+def _score_chunk(pairs):
+    """Unidade de trabalho: calcula a similaridade de um bloco de pares (i, j)."""
+    return [(i, j, _pair_similarity(_worker_graphs, i, j)) for i, j in pairs]
+
+def _chunks(n, chunk_size):
+    """Divide os pares do triângulo superior (i < j) em blocos de até chunk_size."""
+    chunk = []
+    for i in range(n):
+        for j in range(i + 1, n):
+            chunk.append((i, j))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def compute_similarity_matrix(queries: list, workers=None, chunk_size=256,
+                              upper_triangle=False, progress=True):
+    """
+    Calcula a matriz N x N de similaridade entre todas as queries.
+
+    Queries com a mesma impressão digital (ver `graph_cache`) compartilham o
+    grafo e só cada par distinto de grafos é comparado. Cada grafo é enviado uma
+    única vez a cada processo do pool; os pares são distribuídos em blocos de
+    `chunk_size`.
+
+    Args:
+        queries: Lista de strings SQL.
+        workers: Número de processos (None = número de CPUs; 1 = sem pool).
+        chunk_size: Quantidade de pares por unidade de trabalho.
+        upper_triangle: Se True, deixa o triângulo inferior como None em vez de
+            espelhar o superior.
+        progress: Se True, reporta o progresso em stderr.
+
+    Returns:
+        A matriz como lista de listas de floats (percentuais).
+    """
+    cache = GraphCache(maxsize=max(1, len(queries)))
+    graphs = []        # Grafos distintos
+    graph_index = {}   # Impressão digital -> índice em graphs
+    query_graph = []   # Query -> índice do seu grafo (None se inválida)
+    for sql in queries:
+        fingerprint = cache.fingerprint(sql)
+        if fingerprint is not None and fingerprint not in graph_index:
+            graph_index[fingerprint] = len(graphs)
+            graphs.append(cache.get_graph(sql))
+        query_graph.append(graph_index.get(fingerprint))
+
+    n = len(graphs)
+    similarities = {}
+    total = n * (n - 1) // 2
+    done = 0
+
+    def record(results):
+        nonlocal done
+        for i, j, similarity in results:
+            similarities[(i, j)] = similarity
+        done += len(results)
+        if progress:
+            print(f"\rPares comparados: {done}/{total}", end='', file=sys.stderr, flush=True)
+
+    if workers == 1:
+        _init_worker(graphs)
+        for chunk in _chunks(n, chunk_size):
+            record(_score_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(graphs,)) as executor:
+            futures = [executor.submit(_score_chunk, chunk) for chunk in _chunks(n, chunk_size)]
+            for future in as_completed(futures):
+                record(future.result())
+
+    if progress and total:
+        print(file=sys.stderr)
+
+    # Expande a matriz de grafos distintos para a matriz de queries
+    size = len(queries)
+    matrix = [[None] * size for _ in range(size)]
+    for i, a in enumerate(query_graph):
+        for j in range(i if upper_triangle else 0, size):
+            b = query_graph[j]
+            if a is None or b is None:
+                matrix[i][j] = 0.0
+            elif a == b:
+                matrix[i][j] = 100.0 if graphs[a].nodes else 0.0
+            else:
+                matrix[i][j] = similarities[(a, b) if a < b else (b, a)]
+    return matrix
+
+def write_matrix(matrix: list, path: str):
+    """
+    Grava a matriz em disco: `.npy` (requer numpy) ou CSV para qualquer outra
+    extensão. Entradas ausentes viram NaN no `.npy` e células vazias no CSV.
+    """
+    if os.path.splitext(path)[1].lower() == '.npy':
+        import numpy as np
+        array = np.array([[float('nan') if v is None else v for v in row] for row in matrix])
+        np.save(path, array)
+        return
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        for row in matrix:
+            writer.writerow(['' if v is None else f"{v:.2f}" for v in row])
@@ -0,0 +1,133 @@
+import random
+
+# Vocabulário usado nos nomes sintéticos; nomes extras recebem um sufixo numérico
+TABLE_NAMES = ['users', 'orders', 'products', 'payments', 'customers', 'invoices',
+               'shipments', 'reviews', 'categories', 'suppliers', 'employees', 'stores']
+COLUMN_NAMES = ['id', 'name', 'status', 'created_at', 'amount', 'price', 'email', 'age',
+                'city', 'country', 'quantity', 'total', 'type', 'code', 'score', 'updated_at']
+FILTER_KINDS = ['EQUALS', 'IN', 'NOT_NULL']
+
+class QuerySpec:
+    """
+    Descrição de uma query sintética: tabelas (nome, alias, colunas), quantas
+    delas entram por JOIN e os filtros (índice da tabela, coluna, tipo).
+    """
+    def __init__(self, tables, joins, filters):
+        self.tables = tables
+        self.joins = joins
+        self.filters = filters
+
+def _pick_name(rng, pool, used):
+    """Sorteia um nome do vocabulário ainda não usado (ou um nome com sufixo)."""
+    free = [name for name in pool if name not in used]
+    if free:
+        return rng.choice(free)
+    suffix = 1
+    while f"{pool[0]}_{suffix}" in used:
+        suffix += 1
+    return f"{pool[0]}_{suffix}"
+
+def random_query_spec(rng, tables=3, joins=2, columns=4, filters=2) -> QuerySpec:
+    """
+    Sorteia uma query com `tables` tabelas, das quais `joins` entram por JOIN
+    (as demais ficam separadas por vírgula no FROM), `columns` colunas
+    selecionadas por tabela e `filters` predicados no WHERE.
+    """
+    joins = max(0, min(joins, tables - 1))
+    table_names = set()
+    table_specs = []
+    for index in range(tables):
+        name = _pick_name(rng, TABLE_NAMES, table_names)
+        table_names.add(name)
+        column_names = set()
+        table_columns = []
+        for _ in range(columns):
+            column = _pick_name(rng, COLUMN_NAMES, column_names)
+            column_names.add(column)
+            table_columns.append(column)
+        table_specs.append((name, f"t{index}", table_columns))
+
+    filter_specs = []
+    for _ in range(filters):
+        table_index = rng.randrange(tables)
+        column = rng.choice(table_specs[table_index][2])
+        filter_specs.append((table_index, column, rng.choice(FILTER_KINDS)))
+    return QuerySpec(table_specs, joins, filter_specs)
+
+def mutate_spec(rng, spec: QuerySpec, overlap=0.5) -> QuerySpec:
+    """
+    Deriva uma query parecida com `spec`: cada tabela, coluna e filtro é mantido
+    com probabilidade `overlap` e trocado por outro caso contrário.
+    """
+    original_names = {name for name, _, _ in spec.tables}
+    table_names = set()
+    table_specs = []
+    for name, alias, table_columns in spec.tables:
+        if rng.random() >= overlap:
+            name = _pick_name(rng, TABLE_NAMES, table_names | original_names)
+        table_names.add(name)
+        column_names = set()
+        new_columns = []
+        for column in table_columns:
+            if rng.random() >= overlap:
+                column = _pick_name(rng, COLUMN_NAMES, column_names | set(table_columns))
+            column_names.add(column)
+            new_columns.append(column)
+        table_specs.append((name, alias, new_columns))
+
+    filter_specs = []
+    for table_index, column, kind in spec.filters:
+        if rng.random() >= overlap:
+            table_index = rng.randrange(len(table_specs))
+            column = rng.choice(table_specs[table_index][2])
+            kind = rng.choice(FILTER_KINDS)
+        elif column not in table_specs[table_index][2]:
+            column = table_specs[table_index][2][0]
+        filter_specs.append((table_index, column, kind))
+    return QuerySpec(table_specs, spec.joins, filter_specs)
+
+def render_sql(spec: QuerySpec) -> str:
+    """Escreve a query descrita por `spec` em SQL."""
+    select = [f"{alias}.{column}" for _, alias, table_columns in spec.tables
+              for column in table_columns]
+
+    first_name, first_alias, first_columns = spec.tables[0]
+    from_clause = f"{first_name} {first_alias}"
+    for name, alias, table_columns in spec.tables[1:spec.joins + 1]:
+        from_clause += (f" JOIN {name} {alias} ON {alias}.{table_columns[0]} = "
+                        f"{first_alias}.{first_columns[0]}")
+    for name, alias, _ in spec.tables[spec.joins + 1:]:
+        from_clause += f", {name} {alias}"
+
+    conditions = []
+    for number, (table_index, column, kind) in enumerate(spec.filters):
+        target = f"{spec.tables[table_index][1]}.{column}"
+        if kind == 'EQUALS':
+            conditions.append(f"{target} = {number}")
+        elif kind == 'IN':
+            conditions.append(f"{target} IN ({number}, {number + 1})")
+        else:
+            conditions.append(f"{target} IS NOT NULL")
+
+    sql = f"SELECT {', '.join(select)} FROM {from_clause}"
+    if conditions:
+        sql += f" WHERE {' AND '.join(conditions)}"
+    return sql
+
+def generate_query_pairs(count, seed=0, tables=3, joins=2, columns=4, filters=2, overlap=0.5):
+    """
+    Gera `count` pares (sql_a, sql_b) reprodutíveis: a mesma semente sempre
+    produz as mesmas queries.
+
+    Args:
+        count: Quantidade de pares.
+        seed: Semente do gerador.
+        tables, joins, columns, filters: Formato das queries (ver `random_query_spec`).
+        overlap: Fração esperada de tabelas, colunas e filtros mantidos de A em B.
+    """
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        spec = random_query_spec(rng, tables, joins, columns, filters)
+        pairs.append((render_sql(spec), render_sql(mutate_spec(rng, spec, overlap))))
+    return pairs
@@ -0,0 +1,58 @@
+import pytest
+
+from graph_corpus import GraphCorpus
+from graph_generator import generate_graph_from_sql
+
+QUERIES = [
+    "SELECT u.id, u.name FROM users u WHERE u.status = 'active'",
+    "SELECT o.amount FROM orders o WHERE o.total IS NOT NULL",
+    "SELECT p.price, p.sku FROM products p WHERE p.sku IN ('a', 'b')",
+]
+
+def keys(graph):
+    graph = graph.to_graph() if hasattr(graph, 'to_graph') else graph
+    return sorted((node.node_type, node.label) for node in graph.nodes.values())
+
+def items(queries):
+    return [(sql, sql, generate_graph_from_sql(sql)) for sql in queries]
+
+def fail_on_write(corpus, monkeypatch):
+    """Faz o próximo append falhar depois de internar as strings, antes de gravar."""
+    def broken(batch):
+        raise OSError('disco cheio')
+    monkeypatch.setattr(corpus, '_encode_segment', broken)
+
+def check(path, queries):
+    with GraphCorpus(path, create=False) as corpus:
+        assert len(corpus) == len(queries)
+        for graph_id, sql in enumerate(queries):
+            assert keys(corpus[graph_id]) == keys(generate_graph_from_sql(sql))
+
+def test_append_after_failed_append(tmp_path, monkeypatch):
+    path = str(tmp_path / 'corpus.bin')
+    corpus = GraphCorpus(path)
+    corpus.append(items(QUERIES[:1]))
+
+    fail_on_write(corpus, monkeypatch)
+    with pytest.raises(OSError):
+        corpus.append(items(QUERIES[1:2]))
+    monkeypatch.undo()
+
+    corpus.append(items(QUERIES[1:]))
+    check(path, QUERIES)
+
+def test_failed_append_then_append_by_another_writer(tmp_path, monkeypatch):
+    path = str(tmp_path / 'corpus.bin')
+    corpus = GraphCorpus(path)
+    corpus.append(items(QUERIES[:1]))
+
+    fail_on_write(corpus, monkeypatch)
+    with pytest.raises(OSError):
+        corpus.append(items(QUERIES[1:2]))
+    monkeypatch.undo()
+
+    # Outro processo grava strings novas antes do próximo append deste
+    GraphCorpus(path).append(items(QUERIES[2:]))
+    corpus.append(items(QUERIES[1:2]))
+    check(path, [QUERIES[0], QUERIES[2], QUERIES[1]])
+    assert keys(corpus[2]) == keys(generate_graph_from_sql(QUERIES[1]))
@@ -0,0 +1,52 @@
+import pytest
+
+import label_encoding
+from label_encoding import LabelMatrix
+
+# Linhas vazias no início, no meio e no fim: o caso em que o reduceat erra
+HISTOGRAMS = [
+    {},
+    {('TABLE', 'users'): 1, ('COLUMN', 'id'): 2},
+    {},
+    {},
+    {('COLUMN', 'id'): 1, ('FILTER', 'EQUALS'): 3},
+    {('TABLE', 'orders'): 1},
+    {},
+]
+QUERIES = [
+    {('TABLE', 'users'): 1, ('COLUMN', 'id'): 1, ('FILTER', 'EQUALS'): 2},
+    {('COLUMN', 'name'): 4},
+    {},
+]
+
+def build_matrix():
+    matrix = LabelMatrix()
+    for histogram in HISTOGRAMS:
+        matrix.add(histogram)
+    return matrix
+
+def expected(query, combine):
+    return [sum(combine(count, row.get(key, 0)) for key, count in query.items())
+            for row in HISTOGRAMS]
+
+@pytest.fixture(params=['numpy', 'python'])
+def matrix(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(label_encoding, '_numpy', lambda: None)
+    return build_matrix()
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_overlaps(matrix, query):
+    assert matrix.overlaps(query) == expected(query, min)
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_dots(matrix, query):
+    assert matrix.dots(query) == expected(query, lambda a, b: a * b)
+
+def test_overlaps_as_array():
+    np = pytest.importorskip('numpy')
+    result = build_matrix().overlaps(QUERIES[0], as_array=True)
+    assert isinstance(result, np.ndarray)
+    assert result.tolist() == expected(QUERIES[0], min)
@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+import mcs_finder
+from graph_generator import generate_graph_from_sql
+from graph_structures import Graph
+from lru_cache import LRUCache
+from mcs_finder import (ForestMCSMatcher, VF2Matcher, find_maximum_common_subgraph,
+                        find_mcs_result, is_common_subgraph)
+from search_stats import SearchStats
+from sql_workload import generate_query_pairs
+
+def random_forest(rng, size):
+    graph = Graph()
+    nodes = []
+    for _ in range(size):
+        node = graph.add_node(rng.choice('AB'), rng.choice('xy'))
+        if nodes and rng.random() < 0.75:
+            graph.add_edge(rng.choice(nodes), node)
+        nodes.append(node)
+    return graph.freeze()
+
+def brute_force_mcs_size(g1, g2):
+    """Tamanho do maior mapeamento válido, testando todas as atribuições."""
+    if len(g1.nodes) < len(g2.nodes):
+        g1, g2 = g2, g1
+    nodes1 = list(g1.nodes)
+    best = 0
+
+    def extend(index, mapping):
+        nonlocal best
+        if len(mapping) + len(nodes1) - index <= best:
+            return
+        if index == len(nodes1):
+            if is_common_subgraph(g1, g2, mapping):
+                best = len(mapping)
+            return
+        used = set(mapping.values())
+        for v in g2.nodes:
+            if v not in used:
+                mapping[nodes1[index]] = v
+                extend(index + 1, mapping)
+                del mapping[nodes1[index]]
+        extend(index + 1, mapping)
+
+    extend(0, {})
+    return best
+
+@pytest.mark.parametrize('seed', range(4))
+def test_forest_engine_is_exact(seed):
+    rng = random.Random(seed)
+    for _ in range(40):
+        g1 = random_forest(rng, rng.randint(1, 6))
+        g2 = random_forest(rng, rng.randint(1, 6))
+        matcher = ForestMCSMatcher(g1, g2)
+        mapping = matcher.find_mcs_mapping()
+
+        assert is_common_subgraph(g1, g2, mapping)
+        assert len(mapping) == brute_force_mcs_size(g1, g2)
+        assert matcher.proven_optimal and matcher.upper_bound == len(mapping)
+        assert len(mapping) >= len(VF2Matcher(g1, g2).find_mcs_mapping())
+
+def test_forest_engine_is_the_default_for_forests():
+    rng = random.Random(7)
+    g1, g2 = random_forest(rng, 8), random_forest(rng, 8)
+    result = find_mcs_result(g1, g2, verbose=False)
+    assert result.proven_optimal
+    assert result.size == brute_force_mcs_size(g1, g2)
+
+def test_forest_engine_rejects_graphs_with_cycles():
+    graph = Graph()
+    a, b = graph.add_node('A', 'x'), graph.add_node('A', 'y')
+    graph.add_edge(a, b)
+    graph.add_edge(b, a)
+    with pytest.raises(ValueError):
+        ForestMCSMatcher(graph, graph)
+
+def test_one_against_many_reuses_the_component_cache(monkeypatch):
+    cache = LRUCache(1024)
+    monkeypatch.setattr(mcs_finder, 'COMPONENT_CACHE', cache)
+    pairs = generate_query_pairs(20, seed=3, tables=4)
+    query = generate_graph_from_sql(pairs[0][0])
+    others = [generate_graph_from_sql(sql) for pair in pairs for sql in pair]
+
+    for other in others:
+        mcs = find_maximum_common_subgraph(query, other, verbose=False)
+        # Sem reaproveitar o cache, o resultado é o mesmo
+        fresh = ForestMCSMatcher(query, other, component_cache=LRUCache()).find_mcs_mapping()
+        assert (len(mcs.nodes) if mcs else 0) == len(fresh)
+    # As tabelas da query se repetem na maioria das comparações
+    assert cache.hits > cache.misses
+
+def test_thirty_node_queries_stay_under_the_expansion_limit():
+    # Queries com 8 colunas por tabela: cerca de 30 nós por grafo
+    for sql_a, sql_b in generate_query_pairs(10, seed=0, columns=8):
+        graph_a, graph_b = generate_graph_from_sql(sql_a), generate_graph_from_sql(sql_b)
+        assert len(graph_a.nodes) >= 25
+        stats = SearchStats()
+        result = find_mcs_result(graph_a, graph_b, verbose=False, max_expansions=1000,
+                                 stats=stats)
+        assert stats.engine == 'forest'
+        assert not result.interrupted and result.proven_optimal
+        assert stats.states_expanded <= 1000
@@ -0,0 +1,19 @@
+from query_stream import iter_sql_statements
+
+def split(text):
+    return list(iter_sql_statements(text.splitlines(keepends=True)))
+
+def test_semicolons_in_literals_and_comments():
+    assert split("SELECT ';' FROM t; -- a; b\nSELECT 2;") == [
+        "SELECT ';' FROM t", "-- a; b\nSELECT 2"]
+
+def test_dollar_quoted_body_is_one_statement():
+    function = ("CREATE FUNCTION f() RETURNS int AS $$\n"
+                "  SELECT 1;\n"
+                "  SELECT 2;\n"
+                "$$ LANGUAGE sql")
+    assert split(function + ";\nSELECT 3;") == [function, "SELECT 3"]
+
+def test_tagged_dollar_quotes():
+    body = "DO $fn$ BEGIN PERFORM 1; RAISE NOTICE '$$;'; END $fn$"
+    assert split(body + ";\nSELECT $1 FROM t;") == [body, "SELECT $1 FROM t"]
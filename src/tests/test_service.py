@@ -0,0 +1,34 @@
+import asyncio
+
+from service import ComparisonService
+
+CORPUS = [
+    "SELECT u.id, u.name FROM users u WHERE u.status = 'active'",
+    "SELECT o.id, o.amount FROM orders o WHERE o.status = 'paid'",
+    "SELECT u.name FROM users u JOIN orders o ON u.id = o.user_id",
+    "SELECT p.price FROM products p",
+]
+QUERY = "SELECT u.id, u.name FROM users u JOIN orders o ON u.id = o.user_id WHERE u.status = 'x'"
+
+async def add_and_search(service):
+    for sql in CORPUS:
+        await service.handle({'op': 'add', 'corpus': 'c', 'sql': sql})
+    return await service.handle({'sql': QUERY, 'corpus': 'c', 'k': 3})
+
+def results(response):
+    assert 'error' not in response
+    return [(item['similarity'], item['key'], item['sql']) for item in response['results']]
+
+def test_search_in_pool_matches_index():
+    service = ComparisonService(workers=2)
+    try:
+        response = asyncio.run(add_and_search(service))
+    finally:
+        service.close()
+    assert results(response) == service.corpora['c'].search(QUERY, k=3)
+
+def test_search_without_pool():
+    service = ComparisonService(workers=1)
+    response = asyncio.run(add_and_search(service))
+    assert results(response) == service.corpora['c'].search(QUERY, k=3)
+    assert len(response['results']) == 3
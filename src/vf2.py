@@ -1,6 +1,8 @@
 # Imports e suas classes de Grafo e Funções Geradoras
-from graph_structures import Graph
-from graph_generator import generate_graph_from_sql
+import time
+
+from graph_structures import Graph, expand_graph
+from label_encoding import encode_pair
 
 # ==============================================================================
 # Implementação do Algoritmo VF2
@@ -11,7 +13,11 @@ class VF2Matcher:
     Implementa o algoritmo VF2 para verificar o isomorfismo entre dois grafos,
     sendo compatível com a estrutura de grafo personalizada.
     """
-    def __init__(self, g1: 'Graph', g2: 'Graph'):
+    def __init__(self, g1: 'Graph', g2: 'Graph', prune=True, time_budget=None,
+                 max_expansions=None, symmetry=True, max_visited=100000):
+        # Grafos compactos são expandidos uma vez por busca, que consulta os
+        # vizinhos a cada passo
+        g1, g2 = expand_graph(g1), expand_graph(g2)
         # Garante que g1 seja o grafo maior para otimização
         if len(g1.nodes) < len(g2.nodes):
             self.g1, self.g2 = g2, g1
@@ -22,16 +28,168 @@ class VF2Matcher:
         
         self.best_mapping = {}
         self.mapping = {}
+        self.reverse_mapping = {}
+        # Modo branch-and-bound: descarta ramos que não podem superar o melhor
+        # mapeamento já encontrado. Com prune=False a busca é exaustiva.
+        self.prune = prune
+        # Orçamento da busca (modo "anytime"): tempo em segundos e/ou número de
+        # estados expandidos. Esgotado o orçamento, fica o melhor mapeamento até
+        # ali, com `upper_bound` limitando o tamanho do MCS verdadeiro.
+        self.time_budget = time_budget
+        self.max_expansions = max_expansions
+        self.expansions = 0
+        self.interrupted = False
+        self.proven_optimal = False
+        self.upper_bound = None
+        # Quebra de simetria: nós intercambiáveis só são usados em ordem
+        # crescente de id, e um mesmo conjunto de pares alcançado em outra ordem
+        # não é explorado de novo (até `max_visited` estados memorizados)
+        self.symmetry = symmetry
+        self.max_visited = max_visited
+
+    @staticmethod
+    def _node_key(node):
+        """Chave semântica usada para casar nós: (tipo, rótulo)."""
+        return (node.node_type, node.label)
+
+    @staticmethod
+    def _lower_twins(graph):
+        """Para cada nó de uma classe de equivalência, os nós da classe com id menor."""
+        twins = {}
+        for members in graph.equivalence_classes():
+            for index in range(1, len(members)):
+                twins[members[index]] = members[:index]
+        return twins
+
+    def _is_new_state(self):
+        """
+        Registra o conjunto de pares do estado atual. Retorna False se ele já foi
+        explorado, alcançado por outra ordem de inclusão dos mesmos pares: a
+        subárvore de busca depende só do conjunto, então não há o que ganhar.
+        """
+        if not self.symmetry:
+            return True
+        key = frozenset(self.mapping.items())
+        if key in self._visited:
+            return False
+        if len(self._visited) < self.max_visited:
+            self._visited.add(key)
+        return True
+
+    def _global_bound(self):
+        """
+        Limite superior para o tamanho de qualquer mapeamento: para cada chave
+        (tipo, rótulo), no máximo min(ocorrências em g1, ocorrências em g2) pares.
+        """
+        counts2 = self.g2.label_counts()
+        return sum(min(count, counts2.get(key, 0))
+                   for key, count in self.g1.label_counts().items())
+
+    def _greedy_mapping(self):
+        """
+        Mapeamento inicial guloso da busca: os nós de g1 são visitados dos
+        rótulos mais raros em g2 para os mais comuns, e cada um é casado com o
+        primeiro nó livre de mesma chave que preserve as arestas para os nós já
+        casados. Dá à busca uma boa solução desde o início.
+        """
+        candidates = {}
+        for v2 in sorted(self.g2.nodes):
+            candidates.setdefault(self._node_key(self.g2.nodes[v2]), []).append(v2)
+
+        def rarity(u1):
+            return (len(candidates.get(self._node_key(self.g1.nodes[u1]), ())), u1)
+
+        mapping = {}
+        used = set()
+        for u1 in sorted(self.g1.nodes, key=rarity):
+            for v2 in candidates.get(self._node_key(self.g1.nodes[u1]), ()):
+                if v2 in used:
+                    continue
+                if all(mapping[n] in self.g2.adjacency_list[v2]
+                       for n in self.g1.adjacency_list[u1] if n in mapping) and \
+                   all(mapping[p] in self.g2.get_predecessors(v2)
+                       for p in self.g1.get_predecessors(u1) if p in mapping):
+                    mapping[u1] = v2
+                    used.add(v2)
+                    break
+        return mapping
+
+    def _budget_exhausted(self):
+        """Conta uma expansão e verifica se o orçamento da busca acabou."""
+        self.expansions += 1
+        if self.max_expansions is not None and self.expansions > self.max_expansions:
+            return True
+        # Consultar o relógio a cada expansão custa caro: verifica a cada 64
+        if self.deadline is not None and not self.expansions & 63:
+            return time.perf_counter() >= self.deadline
+        return False
+
+    def _upper_bound(self):
+        """
+        Limite superior para o tamanho de qualquer extensão do mapeamento atual.
+
+        Um nó não mapeado u1 de g1 só pode ser mapeado, neste ramo, em nós não
+        mapeados de g2 com a mesma chave e que respeitem as arestas de u1 para nós
+        já mapeados (essa restrição só fica mais forte à medida que o mapeamento
+        cresce). Para cada chave, o número de pares adicionais é limitado pelo
+        menor entre os nós de g1 com algum candidato e a união desses candidatos.
+        """
+        mapping = self.mapping
+        mapped_g2 = self.reverse_mapping
+
+        # Nós livres de g2 agrupados por chave
+        free_g2 = {}
+        for v2, node in self.g2.nodes.items():
+            if v2 not in mapped_g2:
+                free_g2.setdefault(self._node_key(node), set()).add(v2)
+
+        # Por chave: [nós de g1 com candidato, união dos candidatos, há nó irrestrito]
+        per_key = {}
+        for u1, node in self.g1.nodes.items():
+            if u1 in mapping:
+                continue
+            key = self._node_key(node)
+            candidates = free_g2.get(key)
+            if not candidates:
+                continue
+
+            domain = None
+            for neighbor1 in self.g1.adjacency_list[u1]:
+                if neighbor1 in mapping:
+                    allowed = self.g2.get_predecessors(mapping[neighbor1])
+                    domain = allowed if domain is None else domain & allowed
+            for predecessor1 in self.g1.get_predecessors(u1):
+                if predecessor1 in mapping:
+                    allowed = self.g2.adjacency_list[mapping[predecessor1]]
+                    domain = allowed if domain is None else domain & allowed
+
+            entry = per_key.setdefault(key, [0, set(), False])
+            if domain is None:
+                entry[0] += 1
+                entry[2] = True
+                continue
+            domain = domain & candidates
+            if domain:
+                entry[0] += 1
+                entry[1] |= domain
+
+        bound = len(mapping)
+        for key, (count, union, unrestricted) in per_key.items():
+            available = len(free_g2[key]) if unrestricted else len(union)
+            bound += min(count, available)
+        return bound
 
     def _is_consistent(self, u1, v2):
         """
         Verifica a consistência semântica e estrutural ao adicionar o par (u1, v2).
-        Isso combina as checagens ConsPT e CutPT.
+
+        Não há regra de corte por contagem de vizinhos terminais (o CutPT do
+        VF2): ela só vale para isomorfismo, em que todo vizinho terminal ainda
+        precisa de par. No MCS um vizinho pode ficar de fora, e o corte
+        descartava mapeamentos válidos maiores que o encontrado.
         """
-        # 1. Checagem de consistência semântica
-        node1 = self.g1.nodes[u1]
-        node2 = self.g2.nodes[v2]
-        if node1.node_type != node2.node_type or node1.label != node2.label:
+        # 1. Checagem de consistência semântica (rótulos codificados como inteiros)
+        if self._labels1[u1] != self._labels2[v2]:
             return False
 
         # 2. Checagem de consistência estrutural (look-back)
@@ -41,87 +199,299 @@ class VF2Matcher:
                 if self.mapping[neighbor1] not in self.g2.adjacency_list[v2]:
                     return False
         
+        predecessors2 = self.g2.get_predecessors(v2)
         for predecessor1 in self.g1.get_predecessors(u1):
             if predecessor1 in self.mapping:
-                if self.mapping[predecessor1] not in self.g2.get_predecessors(v2):
+                if self.mapping[predecessor1] not in predecessors2:
                     return False
 
-        # 3. Regras de corte / viabilidade (look-ahead / CutPT)
-        t1_out = sum(1 for n in self.g1.adjacency_list[u1] if n in self.g1_term_out)
-        t2_out = sum(1 for n in self.g2.adjacency_list[v2] if n in self.g2_term_out)
-        if t1_out > t2_out:
-            return False
-
-        t1_in = sum(1 for n in self.g1.get_predecessors(u1) if n in self.g1_term_in)
-        t2_in = sum(1 for n in self.g2.get_predecessors(v2) if n in self.g2_term_in)
-        if t1_in > t2_in:
-            return False
-        
         return True
 
+    @staticmethod
+    def _stamp(stamps, node, neighbors, depth, core):
+        """
+        Marca com a profundidade atual os vizinhos de `node` que entram no conjunto
+        terminal (como o vetor out_1 do artigo original do VF2). `node`
+        acabou de ser mapeado. Retorna a variação no número de nós terminais não
+        mapeados.
+        """
+        delta = 0
+        if stamps[node]:
+            delta -= 1 # O nó era terminal e agora está mapeado
+        else:
+            stamps[node] = depth
+        for n in neighbors:
+            if not stamps[n]:
+                stamps[n] = depth
+                if n not in core:
+                    delta += 1
+        return delta
+
+    @staticmethod
+    def _unstamp(stamps, node, neighbors, depth, core):
+        """
+        Desfaz `_stamp` no backtrack (com `node` já removido do mapeamento).
+        Retorna a variação no número de nós terminais não mapeados.
+        """
+        delta = 0
+        for n in neighbors:
+            if stamps[n] == depth:
+                stamps[n] = 0
+                if n not in core:
+                    delta -= 1
+        if stamps[node] == depth:
+            stamps[node] = 0
+        elif stamps[node]:
+            delta += 1 # O nó volta a ser terminal não mapeado
+        return delta
+
+    def _add_pair(self, u1, v2):
+        """Estende o mapeamento com (u1, v2) e atualiza os conjuntos terminais."""
+        depth = len(self.mapping) + 1
+        self.mapping[u1] = v2
+        self.reverse_mapping[v2] = u1
+        self._out1_len += self._stamp(self._out1, u1, self.g1.adjacency_list[u1], depth, self.mapping)
+        self._out2_len += self._stamp(self._out2, v2, self.g2.adjacency_list[v2], depth, self.reverse_mapping)
+
+    def _remove_pair(self, u1, v2):
+        """Remove (u1, v2) do mapeamento e restaura os conjuntos terminais."""
+        depth = len(self.mapping)
+        del self.mapping[u1]
+        del self.reverse_mapping[v2]
+        self._out1_len += self._unstamp(self._out1, u1, self.g1.adjacency_list[u1], depth, self.mapping)
+        self._out2_len += self._unstamp(self._out2, v2, self.g2.adjacency_list[v2], depth, self.reverse_mapping)
+
     def _compute_candidate_pairs(self):
         """
-        Calcula o conjunto de pares candidatos (Pm) para estender o mapeamento.
-        """
-        if self.mapping:
-            # Conjuntos terminais de saída (T1(m) e T2(m))
-            self.g1_term_out = set()
-            mapped_g1_nodes = self.mapping.keys()
-            for u1 in mapped_g1_nodes:
-                self.g1_term_out.update(self.g1.adjacency_list[u1])
-            self.g1_term_out -= set(mapped_g1_nodes)
-
-            self.g2_term_out = set()
-            mapped_g2_nodes = self.mapping.values()
-            for v2 in mapped_g2_nodes:
-                self.g2_term_out.update(self.g2.adjacency_list[v2])
-            self.g2_term_out -= set(mapped_g2_nodes)
-            
-            # Conjuntos terminais de entrada
-            self.g1_term_in = set()
-            for u1 in mapped_g1_nodes:
-                 self.g1_term_in.update(self.g1.get_predecessors(u1))
-            self.g1_term_in -= set(mapped_g1_nodes)
-            
-            self.g2_term_in = set()
-            for v2 in mapped_g2_nodes:
-                 self.g2_term_in.update(self.g2.get_predecessors(v2))
-            self.g2_term_in -= set(mapped_g2_nodes)
+        Gera, sob demanda e em ordem crescente de (u1, v2), os pares candidatos
+        (Pm) para estender o mapeamento.
 
+        O estado terminal é restaurado pelo backtrack antes de o gerador ser
+        retomado, então as checagens de pertinência são sempre as deste nível.
+        """
+        twins1, twins2 = self._twins1, self._twins2
+        if self.mapping and self._out1_len and self._out2_len:
             # Se houver nós terminais, os candidatos vêm deles
-            if self.g1_term_out and self.g2_term_out:
-                return sorted([(u, v) for u in self.g1_term_out for v in self.g2_term_out])
+            candidates_g2 = [v for v in self.g2_order
+                             if self._out2[v] and v not in self.reverse_mapping]
+            terminal = True
+        else:
+            # Se não, os candidatos são todos os nós não mapeados (primeira iteração)
+            candidates_g2 = [v for v in self.g2_order if v not in self.reverse_mapping]
+            terminal = False
 
-        # Se não, os candidatos são todos os nós não mapeados (primeira iteração)
-        unmapped_g1 = set(self.g1.nodes.keys()) - set(self.mapping.keys())
-        unmapped_g2 = set(self.g2.nodes.keys()) - set(self.mapping.values())
-        return sorted([(u, v) for u in unmapped_g1 for v in unmapped_g2])
+        # Candidatos de g2 agrupados pelo rótulo codificado: pares com rótulos
+        # diferentes nunca são gerados
+        labels2 = self._labels2
+        by_label = {}
+        for v in candidates_g2:
+            # De cada classe de nós intercambiáveis, só o menor livre é candidato
+            if twins2 and not all(t in self.reverse_mapping for t in twins2.get(v, ())):
+                continue
+            by_label.setdefault(labels2[v], []).append(v)
 
-    def _solve(self):
+        labels1 = self._labels1
+        for u in self.g1_order:
+            if u in self.mapping or (terminal and not self._out1[u]):
+                continue
+            if twins1 and not all(t in self.mapping for t in twins1.get(u, ())):
+                continue
+            for v in by_label.get(labels1[u], ()):
+                yield u, v
+
+    def _enter_state(self):
         """
-        Função recursiva principal que implementa o backtracking.
+        Avalia o estado atual (o mapeamento recém-estendido). Retorna True se
+        ele deve ser expandido, False se o ramo foi podado.
         """
         if len(self.mapping) > len(self.best_mapping):
             self.best_mapping = self.mapping.copy()
 
-        candidate_pairs = self._compute_candidate_pairs()
-        
-        for u1, v2 in candidate_pairs:
-            if self._is_consistent(u1, v2):
-                self.mapping[u1] = v2
-                self._solve() # Continua a busca recursivamente
-                del self.mapping[u1] # Backtrack
+        if self.prune:
+            # O melhor mapeamento já atinge o limite global: nada pode superá-lo
+            if len(self.best_mapping) >= self.max_size:
+                self.finished = True
+                return False
+            # Nenhuma extensão deste ramo pode superar o melhor mapeamento
+            if self._upper_bound() <= len(self.best_mapping):
+                return False
+        return True
 
-    def find_mcs_mapping(self):
+    def _solve(self):
         """
-        Ponto de entrada para iniciar a busca pelo MCS.
+        Laço principal do backtracking, sobre uma pilha explícita.
+
+        Cada quadro da pilha é [gerador de candidatos, par adicionado ao entrar
+        no nível, candidatos já consumidos]. Sem recursão, a profundidade não é
+        limitada pelo interpretador, e a busca pode ser pausada (orçamento
+        esgotado) e retomada exatamente de onde parou.
         """
+        stack = self._stack
+        while stack:
+            frame = stack[-1]
+            for u1, v2 in frame[0]:
+                frame[2] += 1
+                if self._is_consistent(u1, v2):
+                    self._add_pair(u1, v2)
+                    if self._is_new_state() and self._enter_state():
+                        stack.append([self._compute_candidate_pairs(), (u1, v2), 0])
+                    else:
+                        self._remove_pair(u1, v2) # Backtrack
+                    break
+            else:
+                # Candidatos do nível esgotados: desfaz o par que o criou
+                stack.pop()
+                if frame[1] is not None:
+                    self._remove_pair(*frame[1])
+                continue
+
+            if self.finished:
+                stack.clear()
+                return
+            if self.budgeted and self._budget_exhausted():
+                # A pilha fica intacta para `resume`
+                self.interrupted = True
+                return
+
+    def _reset_state(self):
+        """Prepara o estado vazio da busca (mapeamentos e conjuntos terminais)."""
         self.mapping = {}
+        self.reverse_mapping = {}
         self.best_mapping = {}
-        self.g1_term_in = self.g1_term_out = self.g2_term_in = self.g2_term_out = set()
+
+        # Estado terminal incremental: profundidade em que cada nó entrou em
+        # T_out (0 = fora do conjunto) e quantos nós terminais não mapeados há
+        self._out1 = dict.fromkeys(self.g1.nodes, 0)
+        self._out2 = dict.fromkeys(self.g2.nodes, 0)
+        self._out1_len = self._out2_len = 0
+        self.g1_order = sorted(self.g1.nodes)
+        self.g2_order = sorted(self.g2.nodes)
+        self._labels1, self._labels2 = encode_pair(self.g1, self.g2)
+
+        self.max_size = self._global_bound()
+        self.finished = False
+        self.interrupted = False
+        self.budgeted = self.time_budget is not None or self.max_expansions is not None
+        self._stack = []
+        self._visited = set()
+        self._twins1 = self._lower_twins(self.g1) if self.symmetry else {}
+        self._twins2 = self._lower_twins(self.g2) if self.symmetry else {}
+
+    def _run(self):
+        """Executa a busca com um orçamento novo e devolve o melhor mapeamento."""
+        self.interrupted = False
+        self.expansions = 0
+        self.deadline = None
+        if self.time_budget is not None:
+            self.deadline = time.perf_counter() + self.time_budget
         self._solve()
-        
+
+        # Mesmo concluída, a busca não prova otimalidade: com os conjuntos
+        # terminais não vazios ela só tenta pares terminais e deixa de lado
+        # casamentos soltos. Só o limite global por rótulos é garantido.
+        self.proven_optimal = len(self.best_mapping) >= self.max_size
+        self.upper_bound = len(self.best_mapping) if self.proven_optimal else self.max_size
+
         # Se os grafos foram trocados, inverte o mapeamento final
         if self.swapped:
             return {v: k for k, v in self.best_mapping.items()}
-        return self.best_mapping
\ No newline at end of file
+        return dict(self.best_mapping)
+
+    def find_mcs_mapping(self):
+        """
+        Ponto de entrada para iniciar a busca pelo MCS.
+        """
+        self._reset_state()
+        # Começa de uma solução gulosa, com ou sem orçamento (assim um orçamento
+        # nunca leva a um resultado maior); a busca só a troca por um
+        # mapeamento estritamente maior
+        self.best_mapping = self._greedy_mapping()
+        if self._enter_state():
+            self._stack.append([self._compute_candidate_pairs(), None, 0])
+        return self._run()
+
+    def resume(self):
+        """
+        Retoma uma busca interrompida pelo orçamento, com um orçamento novo.
+        Em uma busca já concluída, apenas devolve o melhor mapeamento.
+        """
+        return self._run()
+
+    def checkpoint(self) -> dict:
+        """
+        Estado serializável (ex: com pickle ou JSON) de uma busca interrompida:
+        os pares do caminho atual, quantos candidatos cada nível já consumiu e o
+        melhor mapeamento até aqui. Ver `restore`.
+        """
+        return {
+            'pairs': [frame[1] for frame in self._stack[1:]],
+            'consumed': [frame[2] for frame in self._stack],
+            'best_mapping': list(self.best_mapping.items()),
+        }
+
+    def restore(self, state: dict):
+        """
+        Reconstrói a pilha de um `checkpoint` feito com os mesmos grafos (na
+        mesma ordem); em seguida, `resume` continua a busca de onde ela parou.
+        """
+        self._reset_state()
+        self.best_mapping = dict(state['best_mapping'])
+        pairs = [None] + [tuple(pair) for pair in state['pairs']]
+        for pair, consumed in zip(pairs, state['consumed']):
+            if pair is not None:
+                self._add_pair(*pair)
+            candidates = self._compute_candidate_pairs()
+            # O gerador depende só do estado atual, que é o mesmo do momento do
+            # checkpoint: descartar os já consumidos recoloca-o na mesma posição
+            for _ in range(consumed):
+                next(candidates)
+            self._stack.append([candidates, pair, consumed])
+
+class InstrumentedVF2Matcher(VF2Matcher):
+    """
+    VF2Matcher que preenche um SearchStats durante a busca. É uma subclasse
+    para que a busca normal não pague nenhum custo de instrumentação.
+    """
+    def __init__(self, g1: 'Graph', g2: 'Graph', stats, **kwargs):
+        super().__init__(g1, g2, **kwargs)
+        self.stats = stats
+
+    def _enter_state(self):
+        stats = self.stats
+        stats.states_expanded += 1
+        depth = len(self.mapping)
+        if depth > stats.max_depth:
+            stats.max_depth = depth
+        if depth > len(self.best_mapping):
+            stats.time_to_best = time.perf_counter() - self._start
+        return super()._enter_state()
+
+    def _is_new_state(self):
+        if super()._is_new_state():
+            return True
+        self.stats.symmetry_prunes += 1
+        return False
+
+    def _upper_bound(self):
+        bound = super()._upper_bound()
+        if bound <= len(self.best_mapping):
+            self.stats.bound_prunes += 1
+        return bound
+
+    def _is_consistent(self, u1, v2):
+        self.stats.consistency_checks += 1
+        if super()._is_consistent(u1, v2):
+            return True
+        self.stats.pruned_pairs += 1
+        return False
+
+    def _run(self):
+        self._start = time.perf_counter()
+        mapping = super()._run()
+        self.stats.search_seconds += time.perf_counter() - self._start
+        self.stats.best_size = len(mapping)
+        return mapping
+
+    def find_mcs_mapping(self):
+        self._start = time.perf_counter()
+        return super().find_mcs_mapping()
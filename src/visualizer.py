@@ -1,58 +1,289 @@
-import matplotlib.pyplot as plt
-import networkx as nx
+import csv
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
 from graph_structures import Graph
+from lru_cache import LRUCache
+
+# Cor de cada tipo de nó
+COLOR_MAP = {
+    'TABLE': 'skyblue',
+    'COLUMN': 'lightgreen',
+    'FILTER': 'salmon'
+}
+
+# Layouts já calculados, indexados por uma chave do grafo (ex: a impressão
+# digital da query)
+LAYOUT_CACHE = LRUCache(4096)
+
+def hierarchical_layout(graph: Graph) -> dict:
+    """
+    Posições (x, y) determinísticas seguindo a hierarquia TABLE -> COLUMN -> FILTER:
+    a profundidade define a linha, as folhas ocupam colunas consecutivas (em
+    ordem de id) e cada pai fica centrado sobre os seus filhos. Nós com mais de
+    um pai ficam sob o primeiro.
+
+    Returns:
+        Dicionário id do nó -> (x, y).
+    """
+    positions = {}
+    placed = set()
+    next_x = 0
+    roots = [n for n in sorted(graph.nodes) if not graph.predecessor_list[n]]
+    # Nós fora do alcance das raízes (ciclos) viram raízes em ordem de id
+    for root in roots + sorted(graph.nodes):
+        if root in placed:
+            continue
+        placed.add(root)
+        # Pós-ordem iterativa: (nó, profundidade, filhos que ele posiciona ou None)
+        stack = [(root, 0, None)]
+        while stack:
+            node_id, depth, children = stack.pop()
+            if children is None:
+                children = [c for c in sorted(graph.adjacency_list[node_id]) if c not in placed]
+                placed.update(children)
+                stack.append((node_id, depth, children))
+                stack.extend((child, depth + 1, None) for child in reversed(children))
+                continue
+            if children:
+                x = sum(positions[c][0] for c in children) / len(children)
+            else:
+                x = next_x
+                next_x += 1
+            positions[node_id] = (x, -depth)
+    return positions
+
+def layout_for(graph: Graph, key=None) -> dict:
+    """`hierarchical_layout` do grafo, guardado em LAYOUT_CACHE quando há uma chave."""
+    if key is None:
+        return hierarchical_layout(graph)
+    layout = LAYOUT_CACHE.get(key)
+    if layout is None:
+        layout = hierarchical_layout(graph)
+        LAYOUT_CACHE.put(key, layout)
+    return layout
+
+def _draw_panel(ax, graph: Graph, layout, highlight, title, x_offset=0.0):
+    """
+    Desenha o grafo no eixo com as posições deslocadas de `x_offset`.
+    Retorna os limites (x mínimo, x máximo, y mínimo) ocupados.
+    """
+    if not graph or not graph.nodes:
+        if title:
+            ax.text(x_offset, 0.6, title, ha='left', va='bottom', size=11)
+        return x_offset, x_offset + 1, 0
+    layout = layout or hierarchical_layout(graph)
+    positions = {n: (x + x_offset, y) for n, (x, y) in layout.items()}
+
+    segments = [(positions[a], positions[b]) for a, neighbors in graph.adjacency_list.items()
+                for b in neighbors]
+    ax.add_collection(LineCollection(segments, colors='grey', linewidths=1, zorder=1))
+
+    node_ids = sorted(graph.nodes)
+    nodes = [graph.nodes[n] for n in node_ids]
+    alphas = [1.0 if highlight is None or n in highlight else 0.25 for n in node_ids]
+    ax.scatter([positions[n][0] for n in node_ids], [positions[n][1] for n in node_ids],
+               s=900, c=[COLOR_MAP.get(node.node_type, 'grey') for node in nodes],
+               alpha=alphas, edgecolors='black', linewidths=0.5, zorder=2)
+    for node_id, node, alpha in zip(node_ids, nodes, alphas):
+        x, y = positions[node_id]
+        ax.text(x, y, str(node.label), ha='center', va='center', size=7,
+                fontweight='bold', alpha=max(alpha, 0.5), zorder=3)
+
+    xs = [x for x, _ in positions.values()]
+    low = min(y for _, y in positions.values())
+    if title:
+        ax.text((min(xs) + max(xs)) / 2, 0.6, title, ha='center', va='bottom', size=11)
+    return min(xs), max(xs), low
+
+def _new_axes(figure):
+    """Eixo sem marcações: desenhar ticks e molduras só custaria tempo."""
+    ax = figure.add_axes((0, 0, 1, 1), frameon=False)
+    ax.set_axis_off()
+    return ax
+
+def _fit(ax, bounds):
+    """Ajusta os limites do eixo aos painéis desenhados."""
+    ax.set_xlim(min(b[0] for b in bounds) - 0.7, max(b[1] for b in bounds) + 0.7)
+    ax.set_ylim(min(b[2] for b in bounds) - 0.5, 1.3)
+
+def draw_graph(ax, graph: Graph, layout=None, highlight=None, title=None):
+    """
+    Desenha o grafo em um eixo do matplotlib, sem networkx.
+
+    Args:
+        layout: Posições dos nós (padrão: `hierarchical_layout`).
+        highlight: Ids de nós em destaque (ex: os do MCS); os demais ficam
+            esmaecidos. None destaca todos.
+    """
+    ax.set_axis_off()
+    _fit(ax, [_draw_panel(ax, graph, layout, highlight, title)])
+
+def _figure_size(bounds):
+    """Tamanho da figura (polegadas) proporcional à largura e à altura dos painéis."""
+    width = max(b[1] for b in bounds) - min(b[0] for b in bounds) + 1.4
+    depth = 1.8 - min(b[2] for b in bounds)
+    return min(max(4.0, width * 0.9), 40.0), max(2.5, depth * 1.1)
+
+def render_graph(graph: Graph, path: str, title=None, layout=None, dpi=80):
+    """
+    Grava o grafo em um arquivo de imagem, sem janela (backend Agg). O formato
+    vem da extensão de `path` (.png, .svg, .pdf...).
+    """
+    figure = Figure()
+    ax = _new_axes(figure)
+    bounds = [_draw_panel(ax, graph, layout, None, title)]
+    _fit(ax, bounds)
+    figure.set_size_inches(*_figure_size(bounds))
+    figure.savefig(path, dpi=dpi)
+
+def render_pair(graph_a: Graph, graph_b: Graph, result, path: str, title=None,
+                layouts=(None, None), dpi=80):
+    """
+    Grava lado a lado, em um único arquivo, os dois grafos (com os nós do MCS
+    em destaque) e o MCS. Os três painéis ficam em um mesmo eixo, deslocados
+    na horizontal.
+
+    Args:
+        result: MCSResult da comparação (ver `find_mcs_result`).
+        layouts: Posições de A e de B já calculadas (ex: por `layout_for`).
+    """
+    mapping = result.mapping
+    panels = [(graph_a, layouts[0], set(mapping), "Query A"),
+              (graph_b, layouts[1], set(mapping.values()), "Query B"),
+              (result.graph, None, None, f"MCS ({result.size} nós)")]
+    figure = Figure()
+    ax = _new_axes(figure)
+    bounds = []
+    x_offset = 0.0
+    for graph, layout, highlight, panel_title in panels:
+        bounds.append(_draw_panel(ax, graph, layout, highlight, panel_title, x_offset))
+        x_offset = bounds[-1][1] + 2.0
+    if title:
+        ax.text(x_offset / 2 - 1.0, 1.05, title, ha='center', va='bottom', size=12)
+    _fit(ax, bounds)
+    ax.set_ylim(top=1.6)
+    figure.set_size_inches(*_figure_size(bounds))
+    figure.savefig(path, dpi=dpi)
+
+# GraphCache do processo trabalhador, criado no primeiro bloco
+_render_cache = None
+
+def _render_chunk(items, output_dir, fmt, engine):
+    """
+    Unidade de trabalho do pool: compara e desenha um bloco de pares
+    [(número, sql_a, sql_b)]. Retorna [(número, similaridade, arquivo)].
+    """
+    # Importados no trabalhador: o processo principal só distribui os pares
+    import contextlib
+    import io
+    from graph_cache import GraphCache
+    from mcs_finder import find_mcs_result, calculate_similarity_percentage
+
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = GraphCache()
+    cache = _render_cache
+
+    rows = []
+    for number, sql_a, sql_b in items:
+        with contextlib.redirect_stdout(io.StringIO()):
+            graph_a, graph_b = cache.get_graph(sql_a), cache.get_graph(sql_b)
+        if not graph_a or not graph_b:
+            rows.append((number, None, None))
+            continue
+        result = find_mcs_result(graph_a, graph_b, engine=engine, verbose=False)
+        similarity = calculate_similarity_percentage(graph_a, graph_b, result.graph) if result.graph else 0.0
+        # Queries repetidas no log reaproveitam o layout, pela impressão digital
+        layouts = (layout_for(graph_a, cache.fingerprint(sql_a)),
+                   layout_for(graph_b, cache.fingerprint(sql_b)))
+        filename = f"pair_{number:06d}.{fmt}"
+        render_pair(graph_a, graph_b, result, os.path.join(output_dir, filename),
+                    title=f"Par {number}: {similarity:.2f}%", layouts=layouts)
+        rows.append((number, similarity, filename))
+    return rows
+
+def render_pairs(pairs, output_dir: str, fmt='png', workers=None, chunk_size=32,
+                 engine='auto', progress=None) -> list:
+    """
+    Relatório visual de um lote de comparações: um arquivo por par (A, B e o
+    MCS lado a lado) em `output_dir`, mais um `index.csv` com a similaridade
+    de cada par. Os pares são distribuídos em blocos entre processos, sem
+    nenhuma janela (backend Agg).
+
+    Args:
+        pairs: Iterável de (sql_a, sql_b), consumido sob demanda.
+        fmt: Formato das imagens ('png', 'svg'...).
+        workers: Número de processos (None = número de CPUs; 1 = sem pool).
+        progress: Função chamada com o número de pares já desenhados.
+
+    Returns:
+        Lista de (número do par, similaridade ou None se inválido, arquivo).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    def chunks():
+        chunk = []
+        for number, (sql_a, sql_b) in enumerate(pairs, start=1):
+            chunk.append((number, sql_a, sql_b))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    rows = []
+    if workers == 1:
+        for chunk in chunks():
+            rows.extend(_render_chunk(chunk, output_dir, fmt, engine))
+            if progress:
+                progress(len(rows))
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Poucos blocos em andamento por vez: o iterável pode ser um log enorme
+            limit = 2 * workers
+            pending = set()
+            for chunk in chunks():
+                pending.add(executor.submit(_render_chunk, chunk, output_dir, fmt, engine))
+                if len(pending) >= limit:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        rows.extend(future.result())
+                    if progress:
+                        progress(len(rows))
+            for future in pending:
+                rows.extend(future.result())
+            if progress:
+                progress(len(rows))
+    rows.sort()
+
+    with open(os.path.join(output_dir, 'index.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['pair', 'similarity', 'file'])
+        for number, similarity, filename in rows:
+            writer.writerow([number, '' if similarity is None else f"{similarity:.2f}", filename or ''])
+    return rows
 
 def visualize_custom_graph(custom_graph: Graph, title: str):
     """
-    Converte a estrutura de grafo personalizada para um grafo networkx e o visualiza
-    usando matplotlib.
+    Mostra o grafo em uma janela interativa do matplotlib, com o layout
+    hierárquico. Para gravar em arquivo sem janela, use `render_graph`.
 
     Args:
-        custom_graph: Uma instância da sua classe Graph.
+        custom_graph: Uma instância da sua classe Graph (ou um CompactGraph).
     """
     if not custom_graph or not custom_graph.nodes:
         print("Grafo vazio, nada para visualizar.")
         return
 
-    # 1. Converter para um grafo networkx
-    G_nx = nx.DiGraph() # Usamos DiGraph para respeitar a direção das arestas
-
-    # Adiciona os nós com seus atributos
-    for node_id, node_obj in custom_graph.nodes.items():
-        G_nx.add_node(node_id, type=node_obj.node_type, label=node_obj.label)
-
-    # Adiciona as arestas
-    for from_id, neighbors in custom_graph.adjacency_list.items():
-        for to_id in neighbors:
-            G_nx.add_edge(from_id, to_id)
-
-    # 2. Preparar estilos para a visualização
-    # Define um mapa de cores para cada tipo de nó
-    color_map = {
-        'TABLE': 'skyblue',
-        'COLUMN': 'lightgreen',
-        'FILTER': 'salmon'
-    }
-    node_colors = [color_map.get(data['type'], 'grey') for _, data in G_nx.nodes(data=True)]
-
-    # Pega os rótulos para exibição
-    labels = nx.get_node_attributes(G_nx, 'label')
-
-    # 3. Calcular um layout para os nós
-    # O layout de mola (spring) é ótimo para ver a estrutura de clusters
-    pos = nx.spring_layout(G_nx, seed=42, k=0.9)
-
-    # 4. Desenhar o grafo com matplotlib
-    plt.figure(figsize=(14, 9)) # Cria uma figura maior
-    
-    nx.draw(G_nx, pos, 
-            with_labels=True, 
-            labels=labels, 
-            node_color=node_colors, 
-            node_size=2500, 
-            font_size=9, 
-            font_weight='bold',
-            arrowsize=20)
-    
-    plt.title(title, size=16)
-    plt.show()
\ No newline at end of file
+    # O pyplot (e o backend de janela) só é carregado no modo interativo
+    import matplotlib.pyplot as plt
+
+    figure = plt.figure(figsize=(14, 9))
+    draw_graph(figure.add_subplot(), custom_graph)
+    figure.suptitle(title, size=16)
+    plt.show()
@@ -0,0 +1,102 @@
+from array import array
+
+from graph_cache import GraphCache
+from graph_signatures import wl_similarity, wl_subtree_hashes
+from label_encoding import LabelMatrix, _numpy
+from lru_cache import LRUCache
+
+class WLScorer:
+    """
+    Similaridade aproximada entre queries pelo kernel Weisfeiler-Lehman (ver
+    `graph_signatures.wl_similarity`), para respostas em microssegundos onde
+    o MCS exato é caro demais (ex: painéis interativos).
+
+    Os vetores de rótulos WL ficam em cache por impressão digital da query.
+    Queries adicionadas com `add` formam um corpus, pontuado contra uma query
+    de uma vez por `score_all` (vetorizado com numpy, quando instalado).
+    `benchmark.py approx` mede o erro em relação ao MCS exato; os padrões (uma
+    iteração, normalização 'cosine') foram os de menor erro em queries sintéticas.
+    """
+    def __init__(self, cache=None, iterations=1, normalization='cosine', maxsize=4096):
+        if normalization not in ('min', 'cosine'):
+            raise ValueError(f"Normalização desconhecida: {normalization!r}")
+        self.cache = cache or GraphCache()
+        self.iterations = iterations
+        self.normalization = normalization
+        self.vectors = LRUCache(maxsize) # Impressão digital -> Counter de rótulos WL
+        self.keys = []
+        self._matrix = LabelMatrix()
+        # Por linha do corpus: total de rótulos ('min') ou norma ('cosine')
+        self._scales = array('d')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def features(self, sql: str):
+        """Vetor de rótulos WL da query (Counter), ou None se ela for inválida ou vazia."""
+        fingerprint = self.cache.fingerprint(sql)
+        if fingerprint is None:
+            return None
+        vector = self.vectors.get(fingerprint)
+        if vector is None:
+            graph = self.cache.get_graph(sql)
+            if not graph or not graph.nodes:
+                return None
+            vector = wl_subtree_hashes(graph, self.iterations)
+            self.vectors.put(fingerprint, vector)
+        return vector
+
+    def _scale(self, vector) -> float:
+        if self.normalization == 'min':
+            return float(sum(vector.values()))
+        return sum(count * count for count in vector.values()) ** 0.5
+
+    def similarity(self, sql_a: str, sql_b: str) -> float:
+        """Similaridade aproximada (0 a 100) entre duas queries; 0.0 se alguma for inválida."""
+        vector_a, vector_b = self.features(sql_a), self.features(sql_b)
+        if vector_a is None or vector_b is None:
+            return 0.0
+        return wl_similarity(vector_a, vector_b, self.normalization)
+
+    def add(self, sql: str, key=None):
+        """
+        Adiciona uma query ao corpus. Retorna sua linha, ou None se a query for
+        inválida ou vazia.
+        """
+        vector = self.features(sql)
+        if vector is None:
+            return None
+        row = self._matrix.add(vector)
+        self._scales.append(self._scale(vector))
+        self.keys.append(row if key is None else key)
+        return row
+
+    def score_all(self, sql: str) -> list:
+        """Similaridade aproximada da query com cada linha do corpus, em ordem de linha."""
+        vector = self.features(sql)
+        if vector is None or not len(self):
+            return [0.0] * len(self)
+        scale = self._scale(vector)
+        combine = self._matrix.overlaps if self.normalization == 'min' else self._matrix.dots
+
+        np = _numpy()
+        if np is None:
+            if self.normalization == 'min':
+                return [shared / min(scale, row_scale) * 100
+                        for shared, row_scale in zip(combine(vector), self._scales)]
+            return [min(dot / (scale * row_scale) * 100, 100.0)
+                    for dot, row_scale in zip(combine(vector), self._scales)]
+
+        values = combine(vector, as_array=True)
+        scales = np.frombuffer(self._scales, dtype=np.float64)
+        if self.normalization == 'min':
+            denominators = np.minimum(scales, scale)
+        else:
+            denominators = scales * scale
+        return np.minimum(values / denominators * 100, 100.0).tolist()
+
+    def top_k(self, sql: str, k=5) -> list:
+        """As k linhas do corpus mais similares, como lista de (similaridade, chave)."""
+        scores = self.score_all(sql)
+        order = sorted(range(len(scores)), key=lambda row: (-scores[row], row))[:k]
+        return [(scores[row], self.keys[row]) for row in order]